@@ -11,6 +11,9 @@ class BaseField(object):
     def __set__(self, instance, value):
         instance._data[self._name] = value
 
+    def check(self, value):
+        return True
+
 
 class ValueField(BaseField):
 
@@ -18,9 +21,12 @@ class ValueField(BaseField):
         self._type = type
 
     def __set__(self, instance, value):
-        assert isinstance(value, self._type), self._name
+        assert self.check(value), self._name
         super(ValueField, self).__set__(instance, value)
 
+    def check(self, value):
+        return isinstance(value, self._type)
+
 
 class NodeField(ValueField):
     _instance_counter = 0
@@ -33,9 +39,8 @@ class NodeField(ValueField):
 
 class NodeListField(NodeField):
 
-    def __set__(self, instance, value):
-        assert all(isinstance(v, self._type) for v in value), self._name
-        super(ValueField, self).__set__(instance, value)
+    def check(self, value):
+        return all(isinstance(v, self._type) for v in value)
 
 
 class NodeBase(type):
@@ -53,6 +58,7 @@ class NodeBase(type):
         fields.sort(key=lambda f: f._instance_id)
         attrs['_node_fields'] = tuple(f._name for f in fields)
         attrs['_all_fields'] = tuple(all_fields)
+        attrs['_field_set'] = frozenset(all_fields)
 
         attrs['__visit_name__'] = attrs.get('__visit_name__', name)
         return type.__new__(cls, name, bases, attrs)
@@ -62,12 +68,13 @@ class Node(object):
     __metaclass__ = NodeBase
 
     def __init__(self, lineno, col_offset, **kwargs):
-        self._data = {}
         self.lineno = lineno
         self.col_offset = col_offset
 
-        assert all(k in self._all_fields for k in kwargs)
-        assert all(k in kwargs for k in self._all_fields)
+        # kwargs is a new dict on every call, and fields are stored in it
+        # as they are, so checking them is left to the asserts only
+        assert kwargs.viewkeys() == self._field_set
+        assert all(
+            getattr(self.__class__, k).check(v) for k, v in kwargs.items()), kwargs
 
-        for k,v in kwargs.items():
-            setattr(self, k, v)
+        self._data = kwargs
@@ -95,6 +95,10 @@ def visit_exp(env, exp):
     visit(env(context=Context.Load), exp)
 
     if type(exp) in (ast.ELLIPSIS, ast.Call):
+        # calls return tuples, cut down to their first value here. There
+        # is no entry point returning a single value, which any callable
+        # reachable from Lua would need, as the callee is only known at
+        # runtime, and which would make every closure twice
         stacksize = env.asm.stacksize
         # TOS = TOS or (None,)
 
@@ -116,23 +120,24 @@ def visit_exp(env, exp):
 
 
 def visit_explist(env, explist):
-    if not explist:
-        env.asm.emit(Opcode.BUILD_TUPLE, 0)
+    if not is_multi_value(explist):
+        for subnode in explist:
+            visit_exp(env, subnode)
+
+        env.asm.emit(Opcode.BUILD_TUPLE, len(explist))
         return
 
+    # the values of a call or ... at the end are already a tuple
     for subnode in explist[:-1]:
         visit_exp(env, subnode)
 
-    env.asm.emit(Opcode.BUILD_TUPLE, len(explist)-1)
-
-    subnode = explist[-1]
-
-    visit(env(context=Context.Load), subnode)
+    if len(explist) > 1:
+        env.asm.emit(Opcode.BUILD_TUPLE, len(explist)-1)
 
-    if type(subnode) not in (ast.ELLIPSIS, ast.Call):
-        env.asm.emit(Opcode.BUILD_TUPLE, 1)
+    visit(env(context=Context.Load), explist[-1])
 
-    env.asm.emit(Opcode.BINARY_ADD)
+    if len(explist) > 1:
+        env.asm.emit(Opcode.BINARY_ADD)
 
 
 def visit_block(env, stats, return_required=False):
@@ -164,12 +169,38 @@ def visit_fields(env, fields):
 
 
 def is_multi_value(nodes):
-    if nodes and type(nodes) in (ast.ELLIPSIS, ast.Call):
+    if nodes and type(nodes[-1]) in (ast.ELLIPSIS, ast.Call):
         return True
 
     return False
 
 
+def is_fixed_assign(targets, values):
+    # values only have to be expanded when a call or ... at the end of
+    # the list gives the values of more than one target
+    return len(values) >= len(targets) or not is_multi_value(values)
+
+
+def is_distinct_names(targets):
+    # values are stored from the last target to the first, which only
+    # gives the same result as unpacking when no name is assigned twice
+    names = [ subnode.id for subnode in targets if type(subnode) is ast.Name ]
+    return len(names) == len(targets) and len(set(names)) == len(names)
+
+
+def visit_values(env, values, need):
+    """push exactly need values, evaluating all of them"""
+    for i, subnode in enumerate(values):
+        if i < need:
+            visit_exp(env, subnode)
+        else:
+            visit(env(context=Context.Load), subnode)
+            env.asm.emit(Opcode.POP_TOP)
+
+    for i in range(len(values), need):
+        env.asm.load_const(None)
+
+
 def prepare_assign(env, need, have, multi_value):
     padding = need - have
     if multi_value:
@@ -230,6 +261,49 @@ def to_boolean(env):
     env.asm.emit(Opcode.LABEL, l3)
 
 
+COMPARISONS = ('<', '<=', '>', '>=', '==', '~=')
+
+TRUE_CONSTANTS = (ast.TRUE, ast.Number, ast.String)
+FALSE_CONSTANTS = (ast.FALSE, ast.NIL)
+
+
+def visit_test(env, node, label, jump_if):
+    """jump to label if node is true in Lua terms, and jump_if is True,
+    or if node is false, and jump_if is False, otherwise fall through"""
+
+    if type(node) in TRUE_CONSTANTS or type(node) in FALSE_CONSTANTS:
+        if (type(node) in TRUE_CONSTANTS) is jump_if:
+            env.asm.emit(Opcode.JUMP_ABSOLUTE, label)
+        return
+
+    if type(node) is ast.UnaryOp and node.op == 'not':
+        visit_test(env, node.operand, label, not jump_if)
+        return
+
+    if type(node) is ast.BinOp and node.op in ('and', 'or'):
+        # the right operand decides, unless the left one does already
+        if (node.op == 'and') is jump_if:
+            l_skip = Label()
+            visit_test(env, node.left, l_skip, not jump_if)
+            visit_test(env, node.right, label, jump_if)
+            env.asm.emit(Opcode.LABEL, l_skip)
+        else:
+            visit_test(env, node.left, label, jump_if)
+            visit_test(env, node.right, label, jump_if)
+        return
+
+    visit_exp(env, node)
+
+    # comparisons and not already give a bool
+    if not (type(node) is ast.BinOp and node.op in COMPARISONS):
+        to_boolean(env)
+
+    if jump_if:
+        env.asm.emit(Opcode.POP_JUMP_IF_TRUE, label)
+    else:
+        env.asm.emit(Opcode.POP_JUMP_IF_FALSE, label)
+
+
 @visit.match(ast.Name)
 def visit(env, node):
     if not node._env:
@@ -287,6 +361,21 @@ def visit(env, node):
 
 @visit.match(ast.Assign)
 def visit(env, node):
+    if is_fixed_assign(node.target, node.value):
+        if len(node.target) == 1 and type(node.target[0]) in (ast.Subscript, ast.Attribute):
+            visit(env(context=None), node.target[0]) # use None to skip STORE_
+            visit_values(env, node.value, 1)
+            env.asm.emit(Opcode.ROT_THREE)
+            env.asm.emit(Opcode.STORE_SUBSCR)
+            return
+
+        if is_distinct_names(node.target):
+            visit_values(env, node.value, len(node.target))
+
+            for subnode in reversed(node.target):
+                visit(env(context=Context.Store), subnode)
+            return
+
     subscript_count = 0
 
     for subnode in node.target:
@@ -388,11 +477,8 @@ def visit(env, node):
 
     env.asm.emit(Opcode.LABEL, l_before)
 
-    visit(env, node.test)
-    to_boolean(env)
-    assert env.asm.stacksize == 1
-
-    env.asm.emit(Opcode.POP_JUMP_IF_FALSE, l_after)
+    visit_test(env, node.test, l_after, False)
+    assert env.asm.stacksize == 0
 
     visit_block(env(break_target=l_after), node.body)
 
@@ -409,23 +495,17 @@ def visit(env, node):
 
     visit_block(env(break_target=l_after), node.body)
 
-    visit(env, node.test)
-    to_boolean(env)
-    assert env.asm.stacksize == 1
-
-    env.asm.emit(Opcode.POP_JUMP_IF_FALSE, l_before)
+    visit_test(env, node.test, l_before, False)
+    assert env.asm.stacksize == 0
 
     env.asm.emit(Opcode.LABEL, l_after)
 
 
 @visit.match(ast.If)
 def visit(env, node):
-    visit(env, node.test)
-    to_boolean(env)
-
     l_before, l_after = Label(), Label()
 
-    env.asm.emit(Opcode.POP_JUMP_IF_FALSE, l_before)
+    visit_test(env, node.test, l_before, False)
     assert env.asm.stacksize == 0
 
     visit_block(env, node.body)
@@ -440,65 +520,32 @@ def visit(env, node):
 
 @visit.match(ast.For)
 def visit(env, node):
-    visit_symbol(env(context=Context.Load), node._validate_forloop)
-    visit(env(context=Context.Load), node.start)
-    visit(env(context=Context.Load), node.stop)
-    visit(env(context=Context.Load), node.step)
-    env.asm.emit(Opcode.CALL_FUNCTION, 3)
-    env.asm.emit(Opcode.UNPACK_SEQUENCE, 3)
-
-    var, limit, step = node._loopvar
+    # the loop is run by FOR_ITER over an iterator of the values of the
+    # control variable, kept in the hidden loop variable
+    iterator = node._loopvar
 
-    for symbol in node._loopvar:
-        visit_symbol(env(context=Context.Store), symbol)
+    visit_symbol(env(context=Context.Load), node._forloop_range)
+    visit_exp(env, node.start)
+    visit_exp(env, node.stop)
+    visit_exp(env, node.step)
+    env.asm.emit(Opcode.CALL_FUNCTION, 3)
+    visit_symbol(env(context=Context.Store), iterator)
 
     l_before, l_after = Label(), Label()
-    l_smaller, l_body = Label(), Label()
 
     env.asm.emit(Opcode.LABEL, l_before)
 
-    # if step > 0
-    visit_symbol(env(context=Context.Load), step)
-    env.asm.load_const(0)
-    env.asm.emit(Opcode.COMPARE_OP, 4)
-    env.asm.emit(Opcode.POP_JUMP_IF_FALSE, l_smaller)
-
-    #   if var > limit
-    visit_symbol(env(context=Context.Load), var)
-    visit_symbol(env(context=Context.Load), limit)
-    env.asm.emit(Opcode.COMPARE_OP, 4)
-    #     break
-    env.asm.emit(Opcode.POP_JUMP_IF_TRUE, l_after)
-    env.asm.emit(Opcode.JUMP_FORWARD, l_body)
-
-    env.asm.emit(Opcode.LABEL, l_smaller)
-    # elif step < 0
-    visit_symbol(env(context=Context.Load), step)
-    env.asm.load_const(0)
-    env.asm.emit(Opcode.COMPARE_OP, 0)
-    env.asm.emit(Opcode.POP_JUMP_IF_FALSE, l_body)
-
-    #   if var < limit
-    visit_symbol(env(context=Context.Load), var)
-    visit_symbol(env(context=Context.Load), limit)
-    env.asm.emit(Opcode.COMPARE_OP, 0)
-    #     break
-    env.asm.emit(Opcode.POP_JUMP_IF_TRUE, l_after)
-
-    env.asm.emit(Opcode.LABEL, l_body)
+    visit_symbol(env(context=Context.Load), iterator)
+    env.asm.emit(Opcode.FOR_ITER, l_after)
+
     # local v = var
-    visit_symbol(env(context=Context.Load), var)
     visit(env(context=Context.Store), node.target)
+    env.asm.emit(Opcode.POP_TOP)
+    assert env.asm.stacksize == 0
 
     # block
     visit_block(env(break_target=l_after), node.body)
 
-    # var = var + step
-    visit_symbol(env(context=Context.Load), var)
-    visit_symbol(env(context=Context.Load), step)
-    env.asm.emit(Opcode.BINARY_ADD)
-    visit_symbol(env(context=Context.Store), var)
-
     env.asm.emit(Opcode.JUMP_ABSOLUTE, l_before)
 
     env.asm.emit(Opcode.LABEL, l_after)
@@ -506,16 +553,16 @@ def visit(env, node):
 
 @visit.match(ast.ForEach)
 def visit(env, node):
-    # local f, s, var = explist
-    f, s, var = node._loopvar
-
-    visit_explist(env(context=Context.Load), node.iter)
-    prepare_assign(env, 3, len(node.iter), True)
+    # like numeric for loops, the loop is run by FOR_ITER, over an
+    # iterator of the values of f(s, var) made from the explist
+    iterator = node._loopvar
+    count = len(node.target)
 
-    env.asm.emit(Opcode.UNPACK_SEQUENCE, 3)
-
-    for symbol in node._loopvar:
-        visit_symbol(env(context=Context.Store), symbol)
+    visit_symbol(env(context=Context.Load), node._foreach_iter)
+    env.asm.load_const(count)
+    visit_explist(env, node.iter)
+    env.asm.emit(Opcode.CALL_FUNCTION_VAR, 1)
+    visit_symbol(env(context=Context.Store), iterator)
 
     assert env.asm.stacksize == 0
 
@@ -523,34 +570,17 @@ def visit(env, node):
 
     env.asm.emit(Opcode.LABEL, l_before)
 
-    # local var... = f(s,var)
-    for symbol in node._loopvar:
-        visit_symbol(env(context=Context.Load), symbol)
-
-    env.asm.emit(Opcode.CALL_FUNCTION, 2)
-
-    prepare_assign(env, len(node.target), 1, True)
+    visit_symbol(env(context=Context.Load), iterator)
+    env.asm.emit(Opcode.FOR_ITER, l_after)
 
-    env.asm.emit(Opcode.UNPACK_SEQUENCE, len(node.target))
+    # local var_1, ..., var_n = values
+    if count > 1:
+        env.asm.emit(Opcode.UNPACK_SEQUENCE, count)
 
     for subnode in node.target:
         visit(env(context=Context.Store), subnode)
 
-    assert env.asm.stacksize == 0
-
-    # if var_1 == nil then break end
-    visit(env(context=Context.Load), node.target[0])
-
-    env.asm.load_const(None)
-    env.asm.emit(Opcode.COMPARE_OP, 8)
-    env.asm.emit(Opcode.POP_JUMP_IF_TRUE, l_after)
-
-    assert env.asm.stacksize == 0
-
-    # var = var_1
-    visit(env(context=Context.Load), node.target[0])
-    visit_symbol(env(context=Context.Store), var)
-
+    env.asm.emit(Opcode.POP_TOP)
     assert env.asm.stacksize == 0
 
     # block
@@ -581,6 +611,13 @@ def visit(env, node):
 
 @visit.match(ast.AssignLocal)
 def visit(env, node):
+    if is_fixed_assign(node.target, node.value) and is_distinct_names(node.target):
+        visit_values(env, node.value, len(node.target))
+
+        for subnode in reversed(node.target):
+            visit(env(context=Context.Store), subnode)
+        return
+
     visit_explist(env, node.value)
 
     prepare_assign(
@@ -608,8 +645,8 @@ def visit(env, node):
 
 @visit.match(ast.Subscript)
 def visit(env, node):
-    visit(env(context=Context.Load), node.value)
-    visit(env(context=Context.Load), node.slice)
+    visit_exp(env, node.value)
+    visit_exp(env, node.slice)
 
     if env.context is Context.Load:
         env.asm.emit(Opcode.BINARY_SUBSCR)
@@ -619,7 +656,7 @@ def visit(env, node):
 
 @visit.match(ast.Attribute)
 def visit(env, node):
-    visit(env(context=Context.Load), node.value)
+    visit_exp(env, node.value)
 
     env.asm.set_lineno(node.attr.lineno)
     env.asm.load_const(env.stringtable.add(node.attr.id, interned=True))
@@ -632,7 +669,7 @@ def visit(env, node):
 
 @visit.match(ast.Method)
 def visit(env, node):
-    visit(env(context=Context.Load), node.value)
+    visit_exp(env, node.value)
 
     if env.context is Context.Load:
         env.asm.emit(Opcode.DUP_TOP)
@@ -662,9 +699,30 @@ def visit(env, node):
     env.asm.load_const(True)
 
 
+def number_value(node):
+    # numbers folded from constant expressions carry their value
+    value = getattr(node, '_value', None)
+    if value is None:
+        value = to_number(node.n.lower())
+
+    return value
+
+
+def is_float_literal(node):
+    return type(node) is ast.Number and type(number_value(node)) is float
+
+
+def visit_number_check(env, node, types, label):
+    # consumes TOS, jumps to label unless its class is in types
+    env.asm.emit(Opcode.LOAD_ATTR, node._guard[0].slot)
+    visit_symbol(env(context=Context.Load), types)
+    env.asm.emit(Opcode.COMPARE_OP, 6)
+    env.asm.emit(Opcode.POP_JUMP_IF_FALSE, label)
+
+
 @visit.match(ast.Number)
 def visit(env, node):
-    env.asm.load_const(to_number(node.n.lower()))
+    env.asm.load_const(number_value(node))
 
 
 @visit.match(ast.String)
@@ -679,7 +737,13 @@ def visit(env, node):
 
 @visit.match(ast.Field)
 def visit(env, node):
-    visit_exp(env, node.key)
+    if node._hash_key is None:
+        visit_exp(env, node.key)
+    else:
+        visit_symbol(env(context=Context.Load), node._hash_key)
+        visit_exp(env, node.key)
+        env.asm.emit(Opcode.CALL_FUNCTION, 1)
+
     visit_exp(env, node.value)
     env.asm.emit(Opcode.ROT_TWO)
 
@@ -734,19 +798,138 @@ def visit(env, node):
     visit_function(env, '<lambda>', node)
 
 
+FLOAT_BINOPS = {
+    '+': Opcode.BINARY_ADD,
+    '-': Opcode.BINARY_SUBTRACT,
+    '*': Opcode.BINARY_MULTIPLY,
+    '/': Opcode.BINARY_TRUE_DIVIDE,
+    '%': Opcode.BINARY_MODULO,
+}
+
+
+def concat_operands(node):
+    """operands of the chain of .. with node at its top"""
+    operands = []
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+
+        if type(node) is ast.BinOp and node.op == '..':
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            operands.append(node)
+
+    return operands
+
+
 @visit.match(ast.BinOp)
 def visit(env, node):
+    if node.op == '..':
+        operands = concat_operands(node)
+
+        visit_symbol(env(context=Context.Load), node._op)
+        for operand in operands:
+            visit_exp(env, operand)
+
+        if len(operands) <= 0xff:
+            env.asm.emit(Opcode.CALL_FUNCTION, len(operands))
+        else:
+            env.asm.emit(Opcode.BUILD_TUPLE, len(operands))
+            env.asm.emit(Opcode.CALL_FUNCTION_VAR, 0)
+        return
+
+    if node._op is None:
+        # x == nil, nil ~= x
+        operand = node.right if type(node.left) is ast.NIL else node.left
+
+        visit_exp(env, operand)
+        env.asm.load_const(None)
+        env.asm.emit(Opcode.COMPARE_OP, 8 if node.op == '==' else 9)
+        return
+
+    if getattr(node, '_guard', None) is None:
+        visit_symbol(env(context=Context.Load), node._op)
+        visit_exp(env, node.left)
+        visit_exp(env, node.right)
+        env.asm.emit(Opcode.CALL_FUNCTION, 2)
+        return
+
+    # if both operands are numbers, the opcode gives the same result as the
+    # helper, the helper is only called otherwise
+    visit_exp(env, node.left)
+    visit_exp(env, node.right)
+
+    stacksize = env.asm.stacksize
+    l_slow, l_slow_pop, l_after = Label(), Label(), Label()
+
+    check_left = not is_float_literal(node.left)
+    check_right = not is_float_literal(node.right)
+    numbers = node._guard[1]
+
+    # an int is only taken with a float, as the loop counter in s + i
+    if check_left and check_right:
+        env.asm.emit(Opcode.DUP_TOPX, 2)
+        visit_number_check(env, node, numbers, l_slow_pop)
+        visit_number_check(env, node, node._guard[2], l_slow)
+    elif check_right:
+        env.asm.emit(Opcode.DUP_TOP)
+        visit_number_check(env, node, numbers, l_slow)
+    elif check_left:
+        env.asm.emit(Opcode.DUP_TOPX, 2)
+        env.asm.emit(Opcode.POP_TOP)
+        visit_number_check(env, node, numbers, l_slow)
+
+    # Python raises on division by zero, the helper does not
+    if node.op in ('/', '%') and not (
+            not check_right and number_value(node.right) != 0):
+        env.asm.emit(Opcode.DUP_TOP)
+        env.asm.emit(Opcode.POP_JUMP_IF_FALSE, l_slow)
+
+    env.asm.emit(FLOAT_BINOPS[node.op])
+    env.asm.emit(Opcode.JUMP_FORWARD, l_after)
+
+    if check_left and check_right:
+        env.asm.stacksize = stacksize + 1
+        env.asm.emit(Opcode.LABEL, l_slow_pop)
+        env.asm.emit(Opcode.POP_TOP)
+
+    env.asm.stacksize = stacksize
+    env.asm.emit(Opcode.LABEL, l_slow)
     visit_symbol(env(context=Context.Load), node._op)
-    visit(env(context=Context.Load), node.left)
-    visit(env(context=Context.Load), node.right)
+    env.asm.emit(Opcode.ROT_THREE)
     env.asm.emit(Opcode.CALL_FUNCTION, 2)
 
+    env.asm.emit(Opcode.LABEL, l_after)
+    assert env.asm.stacksize == stacksize - 1
+
 
 @visit.match(ast.UnaryOp)
 def visit(env, node):
+    if getattr(node, '_guard', None) is None:
+        visit_symbol(env(context=Context.Load), node._op)
+        visit_exp(env, node.operand)
+        env.asm.emit(Opcode.CALL_FUNCTION, 1)
+        return
+
+    visit_exp(env, node.operand)
+
+    stacksize = env.asm.stacksize
+    l_slow, l_after = Label(), Label()
+
+    env.asm.emit(Opcode.DUP_TOP)
+    visit_number_check(env, node, node._guard[1], l_slow)
+    env.asm.emit(Opcode.UNARY_NEGATIVE)
+    env.asm.emit(Opcode.JUMP_FORWARD, l_after)
+
+    env.asm.emit(Opcode.LABEL, l_slow)
     visit_symbol(env(context=Context.Load), node._op)
-    visit(env(context=Context.Load), node.operand)
+    env.asm.emit(Opcode.ROT_TWO)
     env.asm.emit(Opcode.CALL_FUNCTION, 1)
 
+    env.asm.emit(Opcode.LABEL, l_after)
+    assert env.asm.stacksize == stacksize
+
 
 visit = set_lineno(visit)
@@ -0,0 +1,588 @@
+from ply.lex import LexToken
+
+from . import ast
+from .parse import Parser as YaccParser
+from .scan import Scanner
+
+
+class Parser(YaccParser):
+    """recursive descent parser of the grammar of orz.lua.parse.Parser
+
+    Statements are parsed by recursive descent, expressions by precedence
+    climbing driven by the precedence table of the yacc grammar. The same
+    nodes are built, at the same positions, i.e. the position of the first
+    token of the production, as with yacc and tracking=True.
+    """
+
+    STAT_START = frozenset([
+        'NAME', '(', 'LABEL', 'BREAK', 'GOTO', 'DO', 'WHILE', 'REPEAT',
+        'IF', 'FOR', 'FUNCTION', 'LOCAL'])
+
+    EXP_START = frozenset([
+        'NIL', 'TRUE', 'FALSE', 'NUMBER', 'STRING', 'LONGSTRING', 'ELLIPSIS',
+        'FUNCTION', 'NAME', '(', '{', 'NOT', 'LEN', 'MINUS'])
+
+    UNARY = frozenset(['NOT', 'LEN', 'MINUS'])
+
+
+    def __init__(self, filename):
+        # no LALR tables needed, only the token rules of the grammar
+        self.filename = filename
+        self.lexer = Scanner(self)
+
+        self.binary = {}
+        for level, names in enumerate(self.precedence, 1):
+            for name in names[1:]:
+                self.binary[name] = level, names[0]
+
+        self.unary_level = self.binary.pop('UMINUS')[0]
+        del self.binary['NOT'], self.binary['LEN']
+
+
+    def parse(self, data):
+        lexer = self.lexer
+        lexer.input(data)
+        token = lexer.token
+
+        self.stream = tokens = []
+        while True:
+            t = token()
+            if t is None:
+                break
+            tokens.append(t)
+
+        end = LexToken()
+        end.type = end.value = '$end'
+        end.lineno = lexer.lineno
+        end.lexpos = lexer.lexpos
+        tokens.append(end)
+
+        self.index = 0
+        self.tok = tokens[0]
+
+        if self.tok.type == 'SHEBANG':
+            self.advance()
+
+        start = self.tok
+        body = self.block()
+        if self.tok is not end:
+            self.p_error(self.tok)
+
+        if not body:
+            # yacc reduces the empty block once it has seen the end of input
+            start = end
+
+        return ast.File(body=body, **self.token_position(start))
+
+
+    def token_position(self, t):
+        return {
+            'lineno': t.lineno,
+            'col_offset': self.col_offset(t.lexpos)}
+
+
+    def advance(self):
+        tok = self.tok
+        self.index += 1
+        self.tok = self.stream[self.index]
+        return tok
+
+
+    def expect(self, type):
+        tok = self.tok
+        if tok.type != type:
+            self.p_error(tok)
+        self.index += 1
+        self.tok = self.stream[self.index]
+        return tok
+
+
+    def p_error(self, p):
+        if p is not None and p.type == '$end':
+            p = None
+        super(Parser, self).p_error(p)
+
+
+    def block(self):
+        body = []
+        stat_start = self.STAT_START
+
+        while True:
+            type = self.tok.type
+
+            if type in stat_start:
+                body.append(self.stat())
+            elif type == 'RETURN':
+                body.append(self.retstat())
+                if self.tok.type == ';':
+                    self.advance()
+                return body
+            else:
+                return body
+
+            if self.tok.type == ';':
+                self.advance()
+
+
+    def retstat(self):
+        tok = self.advance()
+
+        if self.tok.type in self.EXP_START:
+            value = self.explist()
+        else:
+            value = []
+
+        return ast.Return(value=value, **self.token_position(tok))
+
+
+    def stat(self):
+        type = self.tok.type
+        if type in ('NAME', '('):
+            return self.stat_exp()
+        return getattr(self, 'stat_' + type.lower())()
+
+
+    def stat_exp(self):
+        start = self.tok
+        node, kind = self.suffixedexp(statement=True)
+
+        if self.tok.type in ('=', ','):
+            target = [node]
+
+            while True:
+                if kind != 'var':
+                    self.p_error(self.tok)
+                if self.tok.type != ',':
+                    break
+                self.advance()
+                node, kind = self.suffixedexp()
+                target.append(node)
+
+            self.expect('=')
+
+            return ast.Assign(
+                target=target,
+                value=self.explist(),
+                **self.token_position(start))
+
+        if kind != 'call':
+            self.p_error(self.tok)
+
+        return ast.CallStatement(
+            body=node,
+            **self.token_position(start))
+
+
+    def stat_label(self):
+        tok = self.advance()
+        name = self.name()
+        self.expect('LABEL')
+        return ast.Label(name=name.id, **self.token_position(tok))
+
+
+    def stat_break(self):
+        tok = self.advance()
+        return ast.Break(**self.token_position(tok))
+
+
+    def stat_goto(self):
+        tok = self.advance()
+        return ast.Goto(target=self.name().id, **self.token_position(tok))
+
+
+    def stat_do(self):
+        tok = self.advance()
+        body = self.block()
+        self.expect('END')
+        return ast.Block(body=body, **self.token_position(tok))
+
+
+    def stat_while(self):
+        tok = self.advance()
+        test = self.exp()
+        self.expect('DO')
+        body = self.block()
+        self.expect('END')
+        return ast.While(test=test, body=body, **self.token_position(tok))
+
+
+    def stat_repeat(self):
+        tok = self.advance()
+        body = self.block()
+        self.expect('UNTIL')
+        test = self.exp()
+        return ast.Repeat(body=body, test=test, **self.token_position(tok))
+
+
+    def stat_if(self):
+        # ELSEIF branches are nested as a single If in orelse of the
+        # previous one, built iteratively to keep long chains off the stack
+        tok = self.advance()
+        test = self.exp()
+        self.expect('THEN')
+        branches = [(tok, test, self.block())]
+
+        while self.tok.type == 'ELSEIF':
+            tok = self.advance()
+            test = self.exp()
+            self.expect('THEN')
+            branches.append((tok, test, self.block()))
+
+        if self.tok.type == 'ELSE':
+            self.advance()
+            orelse = self.block()
+        else:
+            orelse = []
+
+        self.expect('END')
+
+        for tok, test, body in reversed(branches):
+            node = ast.If(
+                test=test,
+                body=body,
+                orelse=orelse,
+                **self.token_position(tok))
+            orelse = [node]
+
+        return node
+
+
+    def stat_for(self):
+        tok = self.advance()
+        name = self.name()
+
+        if self.tok.type != '=':
+            target = [name]
+            while self.tok.type == ',':
+                self.advance()
+                target.append(self.name())
+
+            self.expect('IN')
+            iter = self.explist()
+            self.expect('DO')
+            body = self.block()
+            self.expect('END')
+
+            return ast.ForEach(
+                target=target,
+                iter=iter,
+                body=body,
+                **self.token_position(tok))
+
+        self.advance()
+        start = self.exp()
+        self.expect(',')
+        stop = self.exp()
+
+        if self.tok.type == ',':
+            self.advance()
+            step = self.exp()
+            self.expect('DO')
+        else:
+            step = ast.Number(n="1", **self.token_position(self.expect('DO')))
+
+        body = self.block()
+        self.expect('END')
+
+        return ast.For(
+            target=name,
+            start=start,
+            stop=stop,
+            step=step,
+            body=body,
+            **self.token_position(tok))
+
+
+    def stat_function(self):
+        tok = self.advance()
+
+        first = self.tok
+        name = self.name()
+
+        while self.tok.type == '.':
+            self.advance()
+            name = ast.Attribute(
+                value=name,
+                attr=self.name(),
+                **self.token_position(first))
+
+        if self.tok.type == ':':
+            self.advance()
+            name = ast.Method(
+                value=name,
+                method=self.name(),
+                **self.token_position(first))
+
+        paren = self.tok
+        args, body, varargs = self.funcbody()
+
+        if isinstance(name, ast.Method):
+            args = [ast.Name(id='self', **self.token_position(paren))] + args
+
+        return ast.Function(
+            name=name,
+            args=args,
+            body=body,
+            varargs=varargs,
+            **self.token_position(tok))
+
+
+    def stat_local(self):
+        tok = self.advance()
+
+        if self.tok.type == 'FUNCTION':
+            self.advance()
+            name = self.name()
+            args, body, varargs = self.funcbody()
+            return ast.FunctionLocal(
+                name=name,
+                args=args,
+                body=body,
+                varargs=varargs,
+                **self.token_position(tok))
+
+        target = [self.name()]
+        while self.tok.type == ',':
+            self.advance()
+            target.append(self.name())
+
+        if self.tok.type == '=':
+            self.advance()
+            value = self.explist()
+        else:
+            value = []
+
+        return ast.AssignLocal(
+            target=target,
+            value=value,
+            **self.token_position(tok))
+
+
+    def name(self):
+        tok = self.expect('NAME')
+        return ast.Name(id=tok.value, **self.token_position(tok))
+
+
+    def funcbody(self):
+        self.expect('(')
+        args = []
+        varargs = False
+
+        if self.tok.type == 'ELLIPSIS':
+            self.advance()
+            varargs = True
+        elif self.tok.type != ')':
+            args.append(self.name())
+            while self.tok.type == ',':
+                self.advance()
+                if self.tok.type == 'ELLIPSIS':
+                    self.advance()
+                    varargs = True
+                    break
+                args.append(self.name())
+
+        self.expect(')')
+        body = self.block()
+        self.expect('END')
+        return args, body, varargs
+
+
+    def explist(self):
+        values = [self.exp()]
+        while self.tok.type == ',':
+            self.advance()
+            values.append(self.exp())
+        return values
+
+
+    def exp(self, limit=0):
+        """parse operators of a level higher than limit
+
+        As with the conflict resolution of yacc, an operator of the same
+        level is shifted if it is right associative, reduced if it is left
+        associative and a syntax error if it is not associative.
+        """
+        tok = self.tok
+
+        if tok.type in self.UNARY:
+            self.advance()
+            left = ast.UnaryOp(
+                op=tok.value,
+                operand=self.exp(self.unary_level),
+                **self.token_position(tok))
+        else:
+            left = self.simpleexp()
+
+        binary = self.binary
+        last = None
+
+        while True:
+            op = self.tok
+            level, assoc = binary.get(op.type, (0, None))
+            if level <= limit:
+                return left
+
+            if level == last:
+                self.p_error(op)
+
+            self.advance()
+            left = ast.BinOp(
+                left=left,
+                op=op.value,
+                right=self.exp(level - 1 if assoc == 'right' else level),
+                **self.token_position(tok))
+
+            last = level if assoc == 'nonassoc' else None
+
+
+    def simpleexp(self):
+        tok = self.tok
+        type = tok.type
+
+        if type == 'NUMBER':
+            self.advance()
+            return ast.Number(n=tok.value, **self.token_position(tok))
+        elif type in ('STRING', 'LONGSTRING'):
+            self.advance()
+            return ast.String(s=tok.value, **self.token_position(tok))
+        elif type in ('NIL', 'TRUE', 'FALSE'):
+            self.advance()
+            return self.CONSTANTS[tok.value](**self.token_position(tok))
+        elif type == 'ELLIPSIS':
+            self.advance()
+            return ast.ELLIPSIS(**self.token_position(tok))
+        elif type == 'FUNCTION':
+            self.advance()
+            args, body, varargs = self.funcbody()
+            return ast.Lambda(
+                args=args,
+                body=body,
+                varargs=varargs,
+                **self.token_position(tok))
+        elif type == '{':
+            return self.table()
+
+        return self.suffixedexp()[0]
+
+
+    def suffixedexp(self, statement=False):
+        """parse a prefixexp, also returns which production it came from
+
+        'var' for a name, subscript or attribute, 'call' for a function call
+        and 'paren' for an expression in parentheses.
+
+        At the start of a statement, yacc reduces a function call followed
+        by '(' to a statement, the '(' then starts the next statement.
+        """
+        start = self.tok
+
+        if start.type == 'NAME':
+            node = self.name()
+            kind = 'var'
+        elif start.type == '(':
+            self.advance()
+            node = self.exp()
+            self.expect(')')
+            kind = 'paren'
+        else:
+            self.p_error(start)
+
+        while True:
+            type = self.tok.type
+
+            if type == '.':
+                self.advance()
+                node = ast.Attribute(
+                    value=node,
+                    attr=self.name(),
+                    **self.token_position(start))
+                kind = 'var'
+            elif type == '[':
+                self.advance()
+                key = self.exp()
+                self.expect(']')
+                node = ast.Subscript(
+                    value=node,
+                    slice=key,
+                    **self.token_position(start))
+                kind = 'var'
+            elif type == ':':
+                self.advance()
+                method = self.name()
+                node = ast.Call(
+                    func=ast.Method(
+                        value=node,
+                        method=method,
+                        **self.token_position(start)),
+                    args=self.args(),
+                    **self.token_position(start))
+                kind = 'call'
+            elif type in ('(', '{', 'STRING', 'LONGSTRING'):
+                if statement and kind == 'call' and type == '(':
+                    return node, kind
+
+                node = ast.Call(
+                    func=node,
+                    args=self.args(),
+                    **self.token_position(start))
+                kind = 'call'
+            else:
+                return node, kind
+
+
+    def args(self):
+        tok = self.tok
+
+        if tok.type == '(':
+            self.advance()
+            if self.tok.type == ')':
+                args = []
+            else:
+                args = self.explist()
+            self.expect(')')
+            return args
+        elif tok.type == '{':
+            return [self.table()]
+        elif tok.type in ('STRING', 'LONGSTRING'):
+            self.advance()
+            return [ast.String(s=tok.value, **self.token_position(tok))]
+
+        self.p_error(tok)
+
+
+    def table(self):
+        tok = self.expect('{')
+        fields = []
+
+        while self.tok.type != '}':
+            fields.append(self.field())
+            if self.tok.type not in (',', ';'):
+                break
+            self.advance()
+
+        self.expect('}')
+        return ast.Table(fields=fields, **self.token_position(tok))
+
+
+    def field(self):
+        tok = self.tok
+
+        if tok.type == '[':
+            self.advance()
+            key = self.exp()
+            self.expect(']')
+            self.expect('=')
+            return ast.Field(
+                key=key,
+                value=self.exp(),
+                **self.token_position(tok))
+
+        if tok.type == 'NAME' and self.stream[self.index+1].type == '=':
+            self.advance()
+            self.advance()
+            return ast.Field(
+                key=ast.String(s=tok.value, **self.token_position(tok)),
+                value=self.exp(),
+                **self.token_position(tok))
+
+        return self.exp()
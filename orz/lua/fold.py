@@ -0,0 +1,238 @@
+from orz.ast import NodeListField
+from orz.visit import Environment as BaseEnvironment, Visitor
+
+from . import ast
+from .runtime.builtins import BUILTINS, to_number
+
+
+class Environment(BaseEnvironment):
+    FIELDS = ('filename', 'folded')
+
+
+
+visit = Visitor()
+
+
+
+def nop(env, node):
+    return node
+
+
+
+def default(env, node):
+    for field in node._node_fields:
+        if isinstance(getattr(node.__class__, field), NodeListField):
+            setattr(node, field, [visit(env, subnode) for subnode in getattr(node, field)])
+        else:
+            setattr(node, field, visit(env, getattr(node, field)))
+
+    return node
+
+
+def visit_function(env, node):
+    # symbols of the operators folded away, and of the number guards of
+    # their arithmetic, are dropped from the table of the function they
+    # were found in, which is then closed again
+    folded = []
+    default(env(folded=folded), node)
+
+    if folded:
+        node.symtable.discard(folded)
+        node.symtable.close()
+
+    return node
+
+
+NOTHING = object()
+
+CONSTANTS = {
+    ast.NIL: None,
+    ast.TRUE: True,
+    ast.FALSE: False,
+}
+
+
+def get_constant(node):
+    """value of node if it is a literal, or NOTHING"""
+    t = type(node)
+
+    if t is ast.Number:
+        value = getattr(node, '_value', NOTHING)
+        if value is NOTHING:
+            value = to_number(node.n.lower())
+        return value
+
+    if t is ast.String:
+        return node.s
+
+    return CONSTANTS.get(t, NOTHING)
+
+
+def make_constant(value, node):
+    """literal node of value at the position of node, or None"""
+    position = {'lineno': node.lineno, 'col_offset': node.col_offset}
+
+    for cls, constant in CONSTANTS.items():
+        if value is constant:
+            return cls(**position)
+
+    if isinstance(value, str):
+        return ast.String(s=value, **position)
+
+    if type(value) in (float, int, long):
+        number = ast.Number(n=repr(value), **position)
+        number._value = value
+        return number
+
+
+def fold(env, node, op, *args):
+    values = [ get_constant(arg) for arg in args ]
+
+    if NOTHING in values:
+        return node
+
+    # anything raising at runtime is left to be raised at runtime
+    try:
+        value = BUILTINS[op](*values)
+    except Exception:
+        return node
+
+    constant = make_constant(value, node)
+    if constant is None:
+        return node
+
+    if node._op is not None:
+        env.folded.append(node._op)
+    env.folded.extend(getattr(node, '_guard', ()))
+    return constant
+
+
+
+@visit.match(ast.File)
+def visit(env, node):
+    return visit_function(env, node)
+
+
+@visit.match(ast.Field)
+def visit(env, node):
+    node.key = visit(env, node.key)
+    node.value = visit(env, node.value)
+
+    # constant keys other than true, false and zero are used as they are
+    if node._hash_key is not None:
+        key = get_constant(node.key)
+
+        if isinstance(key, (str, float, int, long)) and not isinstance(key, bool) and key != 0:
+            env.folded.append(node._hash_key)
+            node._hash_key = None
+
+    return node
+
+
+def concat_chain(node):
+    """.. nodes and operands of the chain of .. with node at its top"""
+    nodes = []
+    operands = []
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+
+        if type(node) is ast.BinOp and node.op == '..':
+            nodes.append(node)
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            operands.append(node)
+
+    return nodes, operands
+
+
+def fold_concat(env, node):
+    # a chain of .. is compiled to a single concat_n, which runs from the
+    # right like luaV_concat, so only the constants ending the chain can
+    # be joined beforehand: in "a" .. "b" .. t, __concat gets "b" and t
+    nodes, operands = concat_chain(node)
+    operands = [ visit(env, operand) for operand in operands ]
+
+    n = len(operands)
+    while n > 0 and get_constant(operands[n-1]) is not NOTHING:
+        n -= 1
+
+    if len(operands) - n >= 2:
+        values = [ get_constant(operand) for operand in operands[n:] ]
+
+        try:
+            constant = make_constant(BUILTINS['concat_n'](*values), operands[n])
+        except Exception:
+            constant = None
+
+        if constant is not None:
+            operands[n:] = [constant]
+
+    # the nodes of the operands joined are dropped, the top node is kept
+    # at the top of the chain left
+    for dropped in nodes[len(operands)-1:]:
+        env.folded.append(dropped._op)
+
+    result = operands[0]
+    for node, operand in zip(reversed(nodes[:len(operands)-1]), operands[1:]):
+        node.left, node.right = result, operand
+        result = node
+
+    return result
+
+
+@visit.match(ast.BinOp)
+def visit(env, node):
+    if node.op == '..':
+        return fold_concat(env, node)
+
+    node.left = visit(env, node.left)
+    node.right = visit(env, node.right)
+    node = fold(env, node, ".b"+node.op, node.left, node.right)
+
+    # next to a float literal, the other operand may be an int, only two
+    # operands both checked need one of them to be a float
+    guard = getattr(node, '_guard', None)
+    if guard is not None and float in (type(get_constant(node.left)), type(get_constant(node.right))):
+        env.folded.append(guard[2])
+        node._guard = guard[:2]
+
+    return node
+
+
+@visit.match(ast.UnaryOp)
+def visit(env, node):
+    node.operand = visit(env, node.operand)
+    return fold(env, node, ".u"+node.op, node.operand)
+
+
+visit.match(ast.Function)(visit_function)
+visit.match(ast.FunctionLocal)(visit_function)
+visit.match(ast.Lambda)(visit_function)
+visit.match(ast.Label)(nop)
+visit.match(ast.Goto)(nop)
+visit.match(ast.Block)(default)
+visit.match(ast.While)(default)
+visit.match(ast.Repeat)(default)
+visit.match(ast.If)(default)
+visit.match(ast.For)(default)
+visit.match(ast.ForEach)(default)
+visit.match(ast.AssignLocal)(default)
+visit.match(ast.Assign)(default)
+visit.match(ast.CallStatement)(default)
+visit.match(ast.Call)(default)
+visit.match(ast.Return)(default)
+visit.match(ast.Break)(nop)
+visit.match(ast.Subscript)(default)
+visit.match(ast.Attribute)(default)
+visit.match(ast.Method)(default)
+visit.match(ast.Name)(nop)
+visit.match(ast.NIL)(nop)
+visit.match(ast.FALSE)(nop)
+visit.match(ast.TRUE)(nop)
+visit.match(ast.Number)(nop)
+visit.match(ast.String)(nop)
+visit.match(ast.ELLIPSIS)(nop)
+visit.match(ast.Table)(default)
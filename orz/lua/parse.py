@@ -1,5 +1,6 @@
 from orz.parse import SyntaxParser
 from . import ast
+from .scan import Scanner
 
 import re
 
@@ -76,6 +77,14 @@ class Parser(SyntaxParser):
         'nil': ast.NIL}
 
 
+    def __init__(self, filename, scanner=True):
+        super(Parser, self).__init__(filename)
+
+        # the PLY lexer built from the t_ rules below is kept as fallback
+        if scanner:
+            self.lexer = Scanner(self)
+
+
     def t_NAME(self, t):
         r'[a-zA-Z_][a-zA-Z_0-9]*'
         t.type = t.value.upper() if t.value in self.reserved else 'NAME'
@@ -208,11 +217,11 @@ class Parser(SyntaxParser):
 
     def p_ifstat_elseif(self, p):
         """ifstat : ELSEIF exp THEN block ifstat"""
-        p[0] = ast.If(
+        p[0] = [ast.If(
             test=p[2],
             body=p[4],
             orelse=p[5],
-            **self.position(p,1))
+            **self.position(p,1))]
 
 
     def p_ifstat_else(self, p):
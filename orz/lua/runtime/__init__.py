@@ -7,20 +7,30 @@ except ImportError:
 import marshal
 
 
-from .. import parse, scope, label, compile
+from .. import parse, descent, scope, fold, label, compile
+from . import cache
 from .builtins import LuaTable, BUILTINS, mod_builtin, _lua, to_string
 from .string import mod_string
 from .math import mod_math
+from .array import mod_array
 from .table import mod_table
 from .os import mod_os
 from .io import mod_io
+from .strbuf import mod_strbuf
 
 
-def compile_lua(code, filename='<string>'):
-    parser = parse.Parser(filename=filename)
+PARSERS = {
+    'yacc':     parse.Parser,
+    'descent':  descent.Parser,
+}
+
+
+def compile_lua(code, filename='<string>', parser='descent'):
+    parser = PARSERS[parser](filename=filename)
 
     ast = parser.parse(code)
     ast = scope.visit(scope.Environment(filename=filename), ast)
+    ast = fold.visit(fold.Environment(filename=filename), ast)
     ast = label.visit(label.Environment(filename=filename), ast)
     asm = compile.visit(compile.Environment(filename=filename), ast)
 
@@ -33,22 +43,24 @@ def compile_lua(code, filename='<string>'):
 _loaded = LuaTable({
     'string':        mod_string,
     'math':          mod_math,
+    'array':         mod_array,
     "table":         mod_table,
     "io":            mod_io,
     "os":            mod_os,
+    "strbuf":        mod_strbuf,
 })
 
 
 def require(modname):
     modname = to_string(modname)
-    mod = _loaded.data.get(modname, None)
+    mod = _loaded.get(modname, None)
 
     if mod is not None:
         return mod
 
     mod = loadfile(modname+'.lua')()[0]
 
-    _loaded.data[modname] = mod
+    _loaded[modname] = mod
 
     return mod
 
@@ -71,7 +83,10 @@ def load(ld, filename="<string>", mode='t', env=None):
 def loadfile(filename, mode='t', env=None):
     filename = to_string(filename)
 
-    with open(filename, 'r') as f:
+    if mode == 't':
+        return load(cache.compile_file(filename, compile_lua), filename, 'b', env)
+
+    with open(filename, 'rb') as f:
         ld = f.read()
 
     return load(ld, filename, mode, env)
@@ -92,6 +107,7 @@ _G = LuaTable({
 })
 
 
-_G.data.update(mod_builtin.data)
+_G.update(mod_builtin)
 
 _ENV = _G.copy()
+_ENV['_G'] = _ENV
@@ -0,0 +1,345 @@
+from __future__ import absolute_import
+
+import array
+import math
+import operator
+from itertools import imap, repeat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .builtins import LuaTable, _lua, _float_to_int, to_number
+
+
+# Buffers of doubles are numpy arrays when numpy is installed, and
+# array.array('d') otherwise. Either way the values are unboxed, and
+# elementwise arithmetic and reductions loop in C, not in binop().
+# Both backends follow the C doubles of Lua: division by zero, % by zero
+# and overflowing ^ give inf or nan, and never raise.
+
+INF = float("inf")
+NAN = float("nan")
+
+
+def is_odd(y):
+    return math.floor(y) == y and math.fmod(y, 2.0) != 0.0
+
+
+def float_div(x, y):
+    try:
+        return operator.truediv(x, y)
+    except ZeroDivisionError:
+        if x != x or x == 0.0:
+            return NAN
+
+        return math.copysign(INF, x) * math.copysign(1.0, y)
+
+
+def float_mod(x, y):
+    # luai_nummod of Lua 5.2
+    return x - math.floor(float_div(x, y)) * y
+
+
+def float_pow(x, y):
+    try:
+        return operator.pow(x, y)
+    except ZeroDivisionError:
+        # 0 to a negative power
+        if is_odd(y):
+            return math.copysign(INF, x)
+
+        return INF
+    except OverflowError:
+        if x < 0.0 and is_odd(y):
+            return -INF
+
+        return INF
+    except ValueError:
+        # a negative number to a fractional power
+        return NAN
+
+
+class ArrayBackend(object):
+    """buffers of array.array('d'), with the operators of Lua on floats"""
+
+    OPS = {
+        'add': operator.add,
+        'sub': operator.sub,
+        'mul': operator.mul,
+        'div': float_div,
+        'mod': float_mod,
+        'pow': float_pow,
+    }
+
+
+    def new(self, n, value):
+        return array.array('d', [value]) * n
+
+
+    def from_list(self, values):
+        return array.array('d', values)
+
+
+    def apply(self, event, x, y):
+        if not isinstance(x, array.array):
+            x = repeat(x)
+        elif not isinstance(y, array.array):
+            y = repeat(y)
+
+        return array.array('d', imap(self.OPS[event], x, y))
+
+
+    def negate(self, x):
+        return array.array('d', imap(operator.neg, x))
+
+
+    def sum(self, x):
+        return sum(x)
+
+
+    def dot(self, x, y):
+        return sum(imap(operator.mul, x, y))
+
+
+    def min(self, x):
+        return min(x)
+
+
+    def max(self, x):
+        return max(x)
+
+
+class NumpyBackend(object):
+    """buffers of numpy float64 arrays, with the operators of Lua on floats"""
+
+    def __init__(self):
+        self.OPS = {
+            'add': numpy.add,
+            'sub': numpy.subtract,
+            'mul': numpy.multiply,
+            'div': numpy.true_divide,
+            'mod': self.mod,
+            'pow': numpy.power,
+        }
+
+
+    def mod(self, x, y):
+        # luai_nummod of Lua 5.2, numpy.mod follows Python, where -1 % inf
+        # is inf instead of nan
+        return x - numpy.floor(x / y) * y
+
+
+    def new(self, n, value):
+        return numpy.full(n, value)
+
+
+    def from_list(self, values):
+        if None in values:
+            raise TypeError("number expected")
+
+        return numpy.array(values, dtype=numpy.float64)
+
+
+    def apply(self, event, x, y):
+        with numpy.errstate(all='ignore'):
+            return self.OPS[event](x, y)
+
+
+    def negate(self, x):
+        return numpy.negative(x)
+
+
+    def sum(self, x):
+        return float(numpy.sum(x))
+
+
+    def dot(self, x, y):
+        return float(numpy.dot(x, y))
+
+
+    def min(self, x):
+        return float(numpy.min(x))
+
+
+    def max(self, x):
+        return float(numpy.max(x))
+
+
+BACKENDS = {'array': ArrayBackend}
+
+if numpy is not None:
+    BACKENDS['numpy'] = NumpyBackend
+    backend = NumpyBackend()
+else:
+    backend = ArrayBackend()
+
+
+class LuaArray(LuaTable):
+    """table of numbers backed by a buffer of doubles
+
+    Nothing is ever stored in the table itself, indexing and arithmetic
+    go through the metamethods of the metatable shared by all arrays.
+    """
+    __slots__ = ('buffer',)
+
+    def __init__(self, buffer):
+        LuaTable.__init__(self)
+        self.buffer = buffer
+        self._metatable = array_metatable
+
+
+def to_buffer(o):
+    if isinstance(o, LuaArray):
+        return o.buffer
+
+    o = to_number(o)
+    if o is None:
+        raise TypeError("attempt to perform arithmetic on non-number value")
+
+    return o
+
+
+def check_array(a):
+    if not isinstance(a, LuaArray):
+        raise TypeError("array expected")
+
+    return a.buffer
+
+
+def check_index(a, index):
+    try:
+        index = _float_to_int(index)
+    except (OverflowError, ValueError):
+        return
+
+    if index is not None and 0 < index <= len(a.buffer):
+        return index - 1
+
+
+def array_index(a, index):
+    i = check_index(a, index)
+
+    if i is not None:
+        return float(a.buffer[i])
+
+
+def array_newindex(a, index, value):
+    i = check_index(a, index)
+
+    if i is None:
+        raise IndexError("array index out of range")
+
+    v = to_number(value)
+    if v is None:
+        raise TypeError("number expected")
+
+    a.buffer[i] = v
+
+
+def array_len(a):
+    return len(a.buffer)
+
+
+def array_tostring(a):
+    return 'array: ' + hex(id(a))
+
+
+def arith(event):
+
+    def handler(o1, o2):
+        x, y = to_buffer(o1), to_buffer(o2)
+
+        if isinstance(o1, LuaArray) and isinstance(o2, LuaArray) and len(x) != len(y):
+            raise ValueError("arrays of different lengths")
+
+        return LuaArray(backend.apply(event, x, y))
+
+    handler.__name__ = 'array_' + event
+
+    return handler
+
+
+def array_unm(a):
+    return LuaArray(backend.negate(a.buffer))
+
+
+array_metatable = LuaTable({
+    '__index':     _lua(1)(array_index),
+    '__newindex':  _lua(0)(array_newindex),
+    '__len':       _lua(1)(array_len),
+    '__tostring':  _lua(1)(array_tostring),
+    '__add':       _lua(1)(arith('add')),
+    '__sub':       _lua(1)(arith('sub')),
+    '__mul':       _lua(1)(arith('mul')),
+    '__div':       _lua(1)(arith('div')),
+    '__mod':       _lua(1)(arith('mod')),
+    '__pow':       _lua(1)(arith('pow')),
+    '__unm':       _lua(1)(array_unm),
+})
+
+
+def array_new(n, value=0.0):
+    n = _float_to_int(to_number(n))
+    if n is None or n < 0:
+        raise ValueError("bad array size")
+
+    value = to_number(value)
+    if value is None:
+        raise TypeError("number expected")
+
+    return LuaArray(backend.new(n, float(value)))
+
+
+def array_fromtable(t):
+    if not isinstance(t, LuaTable):
+        raise TypeError("table expected")
+
+    try:
+        buffer = backend.from_list(t.list)
+    except (TypeError, ValueError):
+        values = map(to_number, t.list)
+        if None in values:
+            raise TypeError("number expected")
+        buffer = backend.from_list(values)
+
+    return LuaArray(buffer)
+
+
+def array_totable(a):
+    t = LuaTable()
+    t.list = check_array(a).tolist()
+    return t
+
+
+def array_sum(a):
+    return backend.sum(check_array(a))
+
+
+def array_dot(a, b):
+    x, y = check_array(a), check_array(b)
+
+    if len(x) != len(y):
+        raise ValueError("arrays of different lengths")
+
+    return backend.dot(x, y)
+
+
+def array_min(a):
+    return backend.min(check_array(a))
+
+
+def array_max(a):
+    return backend.max(check_array(a))
+
+
+mod_array = LuaTable({
+    'new':         _lua(1)(array_new),
+    'fromtable':   _lua(1)(array_fromtable),
+    'totable':     _lua(1)(array_totable),
+    'sum':         _lua(1)(array_sum),
+    'dot':         _lua(1)(array_dot),
+    'min':         _lua(1)(array_min),
+    'max':         _lua(1)(array_max),
+})
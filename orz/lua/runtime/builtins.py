@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
 from functools import wraps
+from itertools import count, islice, imap, izip
+from operator import itemgetter
 import math
 import operator
 import re
@@ -9,8 +11,24 @@ import types
 
 
 
+# Lua numbers are floats, but loop counters and lengths are kept as ints,
+# which Lua code can not tell apart from them
+NUMBER_TYPES = (float, int, long)
+
+# operands arithmetic opcodes are emitted for. An int is only taken with
+# a float, which the opcode converts it to: two ints would not round like
+# Lua numbers. Longs are left to the helpers, which handle overflows
+OPCODE_NUMBER_TYPES = (float, int)
+OPCODE_FLOAT_TYPES = (float,)
+
+
 def _float_to_int(f):
-    if not isinstance(f, float):
+    cls = f.__class__
+
+    if cls is int or cls is long:
+        return f
+
+    if cls is not float:
         return
 
     i = int(f)
@@ -22,7 +40,7 @@ def to_string(s):
     if isinstance(s, str):
         return s
 
-    if isinstance(s, float):
+    if s.__class__ in NUMBER_TYPES:
         return '{:.14g}'.format(s)
 
     raise TypeError("string expected")
@@ -51,16 +69,87 @@ def _slice(s,i,j):
 
 
 
-class LuaTable(object):
+class HashKey(object):
+    """key of the hash part standing for true, false or zero
+
+    Python takes True for 1 and False for 0, which are different keys in
+    Lua, so these are kept under keys of their own. 1 is always in the
+    array part.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return 'HashKey(%r)' % (self.value,)
+
+
+TRUE_KEY = HashKey(True)
+FALSE_KEY = HashKey(False)
+ZERO_KEY = HashKey(0.0)
+
+
+def hash_key(name):
+    cls = name.__class__
+
+    if cls is bool:
+        return TRUE_KEY if name else FALSE_KEY
+
+    if cls in NUMBER_TYPES and name == 0:
+        return ZERO_KEY
+
+    return name
+
+
+class LuaTable(dict):
+    """Lua table
+
+    The table itself is the hash part, so that reading a key found there
+    never leaves C. The array part is kept in list, and its keys are
+    looked up by __missing__, together with __index.
+    """
+
+    # no __dict__ per table, which would cost more memory than a small
+    # table itself. _rehash_at is the size of the hash part from which a
+    # new integer key makes its integer keys be counted again, to decide
+    # how many of them should move to the array part. _cursor is the last
+    # key returned by next, with the position of the traversal after it
+    __slots__ = ('list', '_metatable', '_rehash_at', '_cursor')
+
+    REHASH_AT = 4
+
+
+    # tables are only equal to themselves, and usable as keys
+    __hash__ = object.__hash__
+
+
+    def __eq__(self, other):
+        return self is other
+
+
+    def __ne__(self, other):
+        return self is not other
+
+
+    def __nonzero__(self):
+        return True
 
 
     def __init__(self, data=None, hint=1):
-        data = data or {}
+        if data:
+            dict.__init__(self, data)
 
-        self.list = [data.pop(i) for i in xrange(1, hint)]
-        self._strip_list()
+        self._metatable = None
+        self._rehash_at = self.REHASH_AT
+        self._cursor = None
+
+        if hint > 1:
+            self.list = [self.pop(i, None) for i in xrange(1, hint)]
+            self._strip_list()
+        else:
+            self.list = []
 
-        self.data = data
         self._propagate_list()
 
 
@@ -70,37 +159,101 @@ class LuaTable(object):
 
 
     def _propagate_list(self):
-        while True:
-            i = len(self.list)+1
+        if not dict.__len__(self):
+            return
+
+        i = len(self.list) + 1
+        value = self.pop(i, None)
+
+        while value is not None:
+            self.list.append(value)
+            i += 1
+            value = self.pop(i, None)
+
 
-            value = self.data.pop(i, None)
+    def _rehash(self):
+        # like computesizes of Lua: the array part gets the largest size
+        # n, a power of 2, such that more than n/2 of the slots 1..n are
+        # used, counting the non nil slots already in the array part
+        nums = []
 
-            if value is None:
+        def add(bits, count):
+            while len(nums) <= bits:
+                nums.append(0)
+            nums[bits] += count
+
+        lst = self.list
+        bits = 0
+        while (1 << bits) >> 1 < len(lst):
+            part = lst[(1 << bits) >> 1:1 << bits]
+            add(bits, len(part) - part.count(None))
+            bits += 1
+
+        for key in self:
+            i = _float_to_int(key)
+            if i is not None and i > 0:
+                add((i - 1).bit_length(), 1)
+
+        total = sum(nums)
+
+        size = 0
+        used = 0
+        for bits, count in enumerate(nums):
+            if (1 << bits) >> 1 >= total:
                 break
 
-            self.list.append(i)
+            used += count
+            if used > (1 << bits) >> 1:
+                size = 1 << bits
+
+        if size > len(lst):
+            lst.extend([self.pop(i, None) for i in xrange(len(lst) + 1, size + 1)])
+            self._strip_list()
+            self._propagate_list()
+
+        self._rehash_at = max(dict.__len__(self) * 2, self.REHASH_AT)
 
 
     def copy(self):
-        return LuaTable(self.data.copy())
+        table = LuaTable(self)
+        table.list = self.list[:]
+        return table
 
 
     def __len__(self):
+        # the array part never ends with nil and key len+1 is never in the
+        # hash part, so its size is a border
         return len(self.list)
 
 
-    def __getitem__(self, name):
-        i = _float_to_int(name)
-        if i is not None:
-            if 1 <= i <= len(self.list):
-                return self.list[i-1]
+    def __missing__(self, name):
+        cls = name.__class__
 
-        value = self.data.get(name, None)
+        if cls is int:
+            if 0 < name <= len(self.list):
+                value = self.list[name-1]
+                if value is not None:
+                    return value
 
-        if value is not None:
-            return value
+        elif cls is float and 1 <= name <= len(self.list):
+            i = int(name)
+            if i == name:
+                value = self.list[i-1]
+                if value is not None:
+                    return value
+
+        if cls is not str:
+            key = hash_key(name)
+            if key is not name:
+                value = dict.get(self, key)
+                if value is not None:
+                    return value
 
-        h = get_event_handler(self, "__index")
+        mt = self._metatable
+        if mt is None:
+            return
+
+        h = mt.get("__index", None)
 
         if h is None:
             return
@@ -108,46 +261,29 @@ class LuaTable(object):
         if isinstance(h, LuaTable): # XXX
             return h[name]
 
-        return h(name)
+        return first_value(h(self, name))
 
 
     def __setitem__(self, name, value):
-        i = _float_to_int(name)
-        if i is not None:
-            length = len(self.list)
+        mt = self._metatable
 
-            if 1 <= i <= length:
-                self.list[i-1] = value
+        if mt is not None:
+            h = mt.get("__newindex", None)
 
-                if i != length or value is not None:
+            if h is not None and self.rawget(name) is None:
+                if isinstance(h, LuaTable):
+                    h[name] = value
                     return
 
-                self._strip_list()
-
-            elif i == length + 1:
-                self.list.append(value)
-                self._propagate_list()
-
-
-        if name in self.data:
-            if value is None:
-                del self.data[name]
-            else:
-                self.data[name] = value
+                h(self, name, value)
+                return
 
+        # strings never go to the array part
+        if name.__class__ is str and value is not None:
+            dict.__setitem__(self, name, value)
             return
 
-        h = get_event_handler(self, "__newindex")
-
-        if h is None:
-            self.data[name] = value
-            return
-
-        if isinstance(h, LuaTable):
-            h[name] = value
-            return
-
-        h(table, name, value)
+        self.rawset(name, value)
 
 
     def __call__(self, *args):
@@ -158,21 +294,62 @@ class LuaTable(object):
         raise Exception("attempt to call a table value")
 
 
-    def rawget(self, index):
-        return self.data.get(index, None)
+    def rawget(self, name):
+        value = dict.get(self, hash_key(name))
+        if value is not None:
+            return value
+
+        i = _float_to_int(name)
+        if i is not None and 1 <= i <= len(self.list):
+            return self.list[i-1]
+
+
+    def rawset(self, name, value):
+        i = _float_to_int(name)
+
+        if i is not None:
+            lst = self.list
+            length = len(lst)
+
+            if 1 <= i <= length:
+                lst[i-1] = value
+
+                if i == length and value is None:
+                    self._strip_list()
 
+                return self
 
-    def rawset(self, index, value):
-        self.data.set(index, value)
+            if i == length + 1:
+                if value is not None:
+                    lst.append(value)
+                    self._propagate_list()
+
+                return self
+
+        if name.__class__ is bool or i == 0:
+            name = hash_key(name)
+
+        if value is None:
+            self.pop(name, None)
+            return self
+
+        # only a new integer key may change the layout of the table, as
+        # assigning to existing fields is allowed during a traversal
+        if i is None or dict.__len__(self) < self._rehash_at or dict.__contains__(self, name):
+            dict.__setitem__(self, name, value)
+            return self
+
+        dict.__setitem__(self, name, value)
+        self._rehash()
         return self
 
 
     def getmetatable(self):
-        mt = getattr(self, '_metatable', None)
+        mt = self._metatable
         if mt is None:
             return
 
-        protected = mt['__metatable']
+        protected = mt.get('__metatable', None)
         if protected is not None:
             return protected
 
@@ -180,18 +357,13 @@ class LuaTable(object):
 
 
     def setmetatable(self, metatable):
-        mt = getattr(self, '_metatable', None) or {}
+        mt = self._metatable
 
         if mt is not None:
-            if mt['__metatable'] is not None:
+            if mt.get('__metatable', None) is not None:
                 raise Exception("cannot change a protected metatable")
 
-        if metatable is None:
-            if mt is not None:
-                delattr(self, '_metatable')
-        else:
-            self.__metatable = metatable
-
+        self._metatable = metatable
         return self
 
 
@@ -223,6 +395,212 @@ def ipairs(t):
     return _ipairs, t, 0.0
 
 
+def _items(t):
+    # keys of the hash part are copied once the array part is done, so
+    # that fields can be cleared during the traversal. A key which has
+    # moved to the array part since is still found by rawget
+    lst = t.list
+    i = 0
+
+    while i < len(lst):
+        value = lst[i]
+        i += 1
+
+        if value is not None:
+            yield i, value
+
+    for key in dict.keys(t):
+        value = dict.get(t, key)
+
+        if value is None:
+            value = t.rawget(key)
+
+        if value is not None:
+            if key.__class__ is HashKey:
+                key = key.value
+
+            yield key, value
+
+
+def _position(t, index):
+    # where the traversal continues after index: the position in the
+    # array part, or the position in a copy of the keys of the hash part
+    if index is None:
+        return 0, None
+
+    key = hash_key(index)
+    if dict.__contains__(t, key):
+        keys = dict.keys(t)
+        return keys.index(key) + 1, keys
+
+    i = _float_to_int(index)
+    if i is not None and 1 <= i <= len(t.list):
+        return i, None
+
+    raise KeyError("invalid key to 'next'")
+
+
+def _next(t, index=None):
+    if not isinstance(t, LuaTable):
+        raise TypeError("table expected")
+
+    cursor = t._cursor
+
+    # the keys of the hash part are compared, true is not 1 there. The key
+    # passed back is most often the very one returned
+    if index is not None and cursor is not None and (
+            cursor[0] is index or cursor[0] == hash_key(index)):
+        i, keys = cursor[1], cursor[2]
+    else:
+        # only a key other than the last one returned needs a search
+        i, keys = _position(t, index)
+
+    if keys is None:
+        lst = t.list
+
+        while i < len(lst):
+            value = lst[i]
+            i += 1
+
+            if value is not None:
+                t._cursor = i, i, None
+                return i, value
+
+        i, keys = 0, dict.keys(t)
+
+    while i < len(keys):
+        key = keys[i]
+        i += 1
+        value = dict.get(t, key)
+
+        # it may have moved to the array part
+        if value is None:
+            value = t.rawget(key)
+
+        if value is not None:
+            t._cursor = key, i, keys
+
+            if key.__class__ is HashKey:
+                return key.value, value
+
+            return key, value
+
+    t._cursor = None
+    return None,
+
+
+def pairs(t):
+    h = get_event_handler(t, "__pairs")
+
+    if h is not None:
+        return tuple(h(t)[:3])
+
+    if not isinstance(t, LuaTable):
+        raise TypeError("table expected")
+
+    return _next, t, None
+
+
+def _foreach(n, f, s, var):
+    while True:
+        values = f(s, var)
+        var = values[0] if values else None
+
+        if var is None:
+            return
+
+        if n == 1:
+            yield var
+        else:
+            if len(values) != n:
+                values = (values + (None,) * n)[:n]
+
+            yield values
+
+
+class LuaIterator(object):
+    """Lua function returning the tuples of values of a Python iterator
+
+    It returns nil once the iterator is exhausted, and is never called
+    by generic for loops, which iterate the Python iterator instead.
+    """
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __call__(self, s=None, var=None):
+        for values in self.values:
+            return values
+
+        return (None,)
+
+
+def foreach_iter(n, f=None, s=None, var=None, *rest):
+    """iterator of the values of the variables of a generic for loop
+
+    ipairs and next over tables, as well as LuaIterator, are iterated
+    natively, other loops call f(s, var) for each iteration.
+    """
+    if f.__class__ is LuaIterator:
+        if n == 1:
+            return imap(itemgetter(0), f.values)
+
+        padding = (None,) * n
+        return ((values + padding)[:n] for values in f.values)
+
+    if isinstance(s, LuaTable):
+        if f is _ipairs and var == 0:
+            mt = s._metatable
+            if mt is None or mt.get("__index", None) is None:
+                # the array part stops at the first nil
+                items = izip(count(1), iter(iter(s.list).next, None))
+            else:
+                items = None
+
+        elif f is _next and var is None:
+            items = _items(s)
+
+        else:
+            items = None
+
+        if items is not None:
+            if n == 1:
+                return imap(itemgetter(0), items)
+
+            if n == 2:
+                return items
+
+            padding = (None,) * (n - 2)
+            return (item + padding for item in items)
+
+    return _foreach(n, f, s, var)
+
+
+def _type(v):
+    if v is None:
+        return "nil"
+
+    cls = v.__class__
+
+    if cls is bool:
+        return "boolean"
+
+    if cls in NUMBER_TYPES:
+        return "number"
+
+    if cls is str:
+        return "string"
+
+    if isinstance(v, LuaTable):
+        return "table"
+
+    if callable(v):
+        return "function"
+
+    return "userdata"
+
+
 def rawequal(v1, v2):
     return (v1 is v2)
 
@@ -257,6 +635,9 @@ def setmetatable(table, metatable):
     if not isinstance(table, LuaTable):
         raise TypeError("table expected")
 
+    if metatable is not None and not isinstance(metatable, LuaTable):
+        raise TypeError("nil or table expected")
+
     return table.setmetatable(metatable)
 
 
@@ -314,7 +695,7 @@ def _tonumber(e):
 
 
 def tonumber(e, base=None):
-    if isinstance(e, float):
+    if e.__class__ in NUMBER_TYPES:
         return e
 
     if not isinstance(e, str):
@@ -338,22 +719,22 @@ def tostring(v):
         types.NoneType: lambda _: 'nil',
         bool: lambda v: {True: 'true', False: 'false'}[v],
         str: lambda v: v,
-        float: '{:.14g}'.format}.get(type(v), None)
+        float: '{:.14g}'.format,
+        int: '{:.14g}'.format,
+        long: '{:.14g}'.format}.get(type(v), None)
 
     if formatter is not None:
         return formatter(v)
 
     if isinstance(v, LuaTable):
-        mt = v.getmetatable()
-        if mt is not None:
-            _tostring = mt["__tostring"]
+        _tostring = get_event_handler(v, "__tostring")
 
-            if _tostring is not None:
-                return _tostring(v)
+        if _tostring is not None:
+            return first_value(_tostring(v))
 
         return 'table: '+ hex(id(v))
 
-    elif isinstance(v, types.FunctionType):
+    elif isinstance(v, (types.FunctionType, LuaIterator)):
         return 'function: ' + hex(id(v))
 
     else:
@@ -379,8 +760,47 @@ def validate_forloop(initial, limit, step):
     return initial, limit, step
 
 
+def _forloop(var, limit, step):
+    if step > 0:
+        while var <= limit:
+            yield var
+            var += step
+    else:
+        while var >= limit:
+            yield var
+            var += step
+
+
+FORLOOP_EXACT = 2.0 ** 53
+
+
+def forloop_range(initial, limit, step):
+    if initial.__class__ is not float or limit.__class__ is not float or step.__class__ is not float:
+        initial, limit, step = validate_forloop(initial, limit, step)
+
+    # all the values are exact with integral numbers, and so is the number
+    # of iterations, which leaves the loop to itertools, counting with ints
+    if (step and not (initial % 1 or limit % 1 or step % 1) and
+            -FORLOOP_EXACT < initial < FORLOOP_EXACT and
+            -FORLOOP_EXACT < limit < FORLOOP_EXACT):
+        return islice(count(int(initial), int(step)), max(int((limit - initial) // step) + 1, 0))
+
+    return _forloop(initial, limit, step)
+
+
 def get_event_handler(o, event):
-    return (getmetatable(o) or LuaTable()).rawget(event)
+    # the metatable is looked up raw, ignoring __metatable, and so are
+    # the events in it
+    if isinstance(o, LuaTable):
+        mt = o._metatable
+        if mt is not None:
+            return mt.get(event, None)
+
+
+def first_value(values):
+    # metamethods are Lua functions, which return tuples
+    if values:
+        return values[0]
 
 
 def getbinhandler(op1, op2, event):
@@ -390,18 +810,21 @@ def getbinhandler(op1, op2, event):
 def binop(event, op):
 
     def handler(op1, op2):
-        o1, o2 = tonumber(op1), tonumber(op2)
+        if op1.__class__ in NUMBER_TYPES and op2.__class__ in NUMBER_TYPES:
+            o1, o2 = op1, op2
+        else:
+            o1, o2 = tonumber(op1), tonumber(op2)
 
         if o1 is not None and o2 is not None:
             try:
-                return op(o1, o2)
+                return op(float(o1), float(o2))
             except OverflowError:
                 return float("inf")
 
         h = getbinhandler(op1, op2, "__"+event)
 
         if h is not None:
-            return h(op1, op2)
+            return first_value(h(op1, op2))
 
         raise TypeError("attempt to perform arithmetic on non-number value")
 
@@ -413,10 +836,10 @@ def binop(event, op):
 def concat_event(op1, op2):
     o1, o2 = op1, op2
 
-    if isinstance(o1, float):
+    if o1.__class__ in NUMBER_TYPES:
         o1 = tostring(o1)
 
-    if isinstance(o1, float):
+    if o2.__class__ in NUMBER_TYPES:
         o2 = tostring(o2)
 
     if isinstance(o1, str) and isinstance(o2, str):
@@ -425,21 +848,55 @@ def concat_event(op1, op2):
     h = getbinhandler(op1, op2, "__concat")
 
     if h is not None:
-        return h(op1, op2)
+        return first_value(h(op1, op2))
 
     raise TypeError("attempt to concatenate non-string value")
 
 
+NUMBER_STRINGS = dict.fromkeys(NUMBER_TYPES, '{:.14g}'.format)
+
+
+def concat_n(*values):
+    """values[0] .. values[1] .. ... .. values[-1]
+
+    Compiled chains of .. are a single call, joining strings and
+    numbers at once. Only other values are concatenated pairwise, as
+    Lua does, from the right.
+    """
+    try:
+        return ''.join([
+            v if v.__class__ is str else NUMBER_STRINGS[v.__class__](v)
+            for v in values ])
+    except KeyError:
+        pass
+
+    values = list(values)
+
+    while len(values) > 1:
+        n = 0
+        for v in reversed(values):
+            if not (isinstance(v, str) or v.__class__ in NUMBER_TYPES):
+                break
+            n += 1
+
+        if n >= 2:
+            values[-n:] = [''.join(map(to_string, values[-n:]))]
+        else:
+            values[-2:] = [concat_event(values[-2], values[-1])]
+
+    return values[0]
+
+
 def unm_event(op):
     o = tonumber(op)
 
     if o is not None:
-        return -o
+        return -float(o)
 
-    h = get_event_handler(o, "__unm")
+    h = get_event_handler(op, "__unm")
 
     if h is not None:
-        return h(o)
+        return first_value(h(op))
 
     raise TypeError("attempt to perform arithmetic on non-number value")
 
@@ -451,7 +908,7 @@ def len_event(op):
     h = get_event_handler(op, "__len")
 
     if h is not None:
-        return h(op)
+        return first_value(h(op))
 
     elif isinstance(op, LuaTable):
         return len(op)
@@ -460,7 +917,7 @@ def len_event(op):
 
 
 def lt_event(op1, op2):
-    if isinstance(op1, float) and isinstance(op2, float):
+    if op1.__class__ in NUMBER_TYPES and op2.__class__ in NUMBER_TYPES:
         return op1 < op2
 
     elif isinstance(op1, str) and isinstance(op2, str):
@@ -469,13 +926,13 @@ def lt_event(op1, op2):
     h = getbinhandler(op1, op2, "__lt")
 
     if h is not None:
-        return not_event(not_event(h(op1, op2)))
+        return is_true(first_value(h(op1, op2)))
 
     raise TypeError("attempt to compare")
 
 
 def le_event(op1, op2):
-    if isinstance(op1, float) and isinstance(op2, float):
+    if op1.__class__ in NUMBER_TYPES and op2.__class__ in NUMBER_TYPES:
         return op1 <= op2
 
     elif isinstance(op1, str) and isinstance(op2, str):
@@ -483,11 +940,11 @@ def le_event(op1, op2):
 
     h = getbinhandler(op1, op2, "__le")
     if h is not None:
-        return not_event(not_event(h(op1, op2)))
+        return is_true(first_value(h(op1, op2)))
 
     h = getbinhandler(op1, op2, "__lt")
     if h is not None:
-        return not_event(h(op2, op1))
+        return not_event(first_value(h(op2, op1)))
 
     raise TypeError("attempt to compare")
 
@@ -508,7 +965,7 @@ def getequalhandler(op1, op2):
         return
 
     mm1 = get_event_handler(op1, "__eq")
-    mm2 = get_event_handler(op1, "__eq")
+    mm2 = get_event_handler(op2, "__eq")
 
     if mm1 == mm2:
         return mm1
@@ -520,7 +977,7 @@ def eq_event(op1, op2):
 
     h = getequalhandler(op1, op2)
     if h is not None:
-        return not_event(not_event(h(op1, op2)))
+        return is_true(first_value(h(op1, op2)))
 
     return False
 
@@ -561,8 +1018,13 @@ def _luadiv(o1, o2):
 
 
 BUILTINS = {
-    'validate_forloop': validate_forloop,
+    'forloop_range': forloop_range,
+    'foreach_iter': foreach_iter,
+    'concat_n': concat_n,
+    '.key': hash_key,
     'LuaTable': LuaTable,
+    '.number': OPCODE_NUMBER_TYPES,
+    '.float': OPCODE_FLOAT_TYPES,
 
     '.b+':   binop("add", operator.add),
     '.b-':   binop("sub", operator.sub),
@@ -588,18 +1050,23 @@ BUILTINS = {
 
 
 def _lua(ret=None):
-    convert_result = {
-        None:   lambda _: tuple(_),
-        1:      lambda _: (_,),
-        0:      lambda _: (),
-        }[ret]
+    # the result is converted in the wrapper itself, so that calling a
+    # builtin costs a single extra frame
 
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args):
-            return convert_result(func(*args))
+        if ret is None:
+            def wrapper(*args):
+                return tuple(func(*args))
+        elif ret == 1:
+            def wrapper(*args):
+                return (func(*args),)
+        else:
+            assert ret == 0
+            def wrapper(*args):
+                func(*args)
+                return ()
 
-        return wrapper
+        return wraps(func)(wrapper)
 
     return decorator
 
@@ -618,6 +1085,8 @@ mod_builtin = LuaTable({
     'error':         _lua(1)(error),
     'getmetatable':  _lua(1)(getmetatable),
     'ipairs':        ipairs,
+    'next':          _next,
+    'pairs':         pairs,
     'print':         _lua(0)(_print),
     'rawequal':      _lua(1)(rawequal),
     'rawget':        _lua(1)(rawget),
@@ -627,4 +1096,5 @@ mod_builtin = LuaTable({
     'setmetatable':  _lua(1)(setmetatable),
     'tonumber':      _lua(1)(tonumber),
     'tostring':      _lua(1)(tostring),
+    'type':          _lua(1)(_type),
 })
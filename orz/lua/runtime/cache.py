@@ -0,0 +1,90 @@
+from __future__ import absolute_import
+
+import imp
+import os
+import struct
+import sys
+import tempfile
+
+
+# bump whenever the generated code changes, so stale caches get rejected
+COMPILER_VERSION = 14
+
+MAGIC = imp.get_magic() + struct.pack('<L', COMPILER_VERSION)
+
+enabled = not os.environ.get('ORZ_LUA_NOCACHE')
+
+
+def cache_path(filename):
+    # __pycache__/foo.luapyc for foo.lua, out of the way of the sources,
+    # and of the bytecode of luac
+    dirname, basename = os.path.split(filename)
+    return os.path.join(
+        dirname, '__pycache__', os.path.splitext(basename)[0] + '.luapyc')
+
+
+def get_header(filename):
+    st = os.stat(filename)
+    return MAGIC + struct.pack('<dQ', st.st_mtime, st.st_size)
+
+
+def read_cache(filename, header):
+    try:
+        with open(cache_path(filename), 'rb') as f:
+            if f.read(len(header)) != header:
+                return
+
+            return f.read()
+    except IOError:
+        return
+
+
+def write_cache(filename, header, ld):
+    cfile = cache_path(filename)
+
+    try:
+        os.mkdir(os.path.dirname(cfile))
+    except OSError:
+        pass
+
+    try:
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(cfile) or os.curdir,
+            prefix=os.path.basename(cfile)+'.')
+    except (IOError, OSError):
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(ld)
+
+        os.chmod(tmp, os.stat(filename).st_mode & 0666)
+
+        # rename is atomic, readers never see a partially written file
+        os.rename(tmp, cfile)
+    except (IOError, OSError):
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def compile_file(filename, compile):
+    if not enabled:
+        with open(filename, 'r') as f:
+            return compile(f.read(), filename)
+
+    header = get_header(filename)
+
+    ld = read_cache(filename, header)
+    if ld is not None:
+        return ld
+
+    with open(filename, 'r') as f:
+        ld = compile(f.read(), filename)
+
+    if not sys.dont_write_bytecode:
+        write_cache(filename, header, ld)
+
+    return ld
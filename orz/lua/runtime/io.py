@@ -80,6 +80,17 @@ _file_metatable = LuaTable({
     'write':  catch_io_error(_lua(1)(file_write)),
     })
 
+_file_metatable.rawset('__index', _file_metatable)
+
+
+class LuaFile(LuaTable):
+    __slots__ = ('_file',)
+
+    def __init__(self, file):
+        LuaTable.__init__(self)
+        self._file = file
+        self._metatable = _file_metatable
+
 
 def io_close(f=None):
     if f is None:
@@ -106,9 +117,7 @@ def io_open(filename, mode='r'):
     filename = to_string(filename)
     mode = to_string(mode)
 
-    f = LuaTable()
-    f._file = open(filename, mode)
-    return f
+    return LuaFile(open(filename, mode))
 
 
 def io_output(f=None):
@@ -128,9 +137,7 @@ def io_read(*args):
 
 def io_tmpfile():
     fd, filename = tempfile.mkstemp()
-    f = LuaTable()
-    f._file = os.fdopen(fd)
-    return f
+    return LuaFile(os.fdopen(fd))
 
 
 def io_type(obj):
@@ -141,7 +148,7 @@ def io_type(obj):
     if f is None:
         return
 
-    if f._file.closed:
+    if f.closed:
         return "closed file"
 
     return "file"
@@ -151,17 +158,11 @@ def io_write(*args):
     return _file_metatable["write"](_default_output, *args)
 
 
-io_stdin = LuaTable()
-io_stdin._metatable = _file_metatable
-io_stdin._file = sys.stdin
+io_stdin = LuaFile(sys.stdin)
 
-io_stdout = LuaTable()
-io_stdout._metatable = _file_metatable
-io_stdout._file = sys.stdout
+io_stdout = LuaFile(sys.stdout)
 
-io_stderr = LuaTable()
-io_stderr._metatable = _file_metatable
-io_stderr._file = sys.stderr
+io_stderr = LuaFile(sys.stderr)
 
 _default_input = io_stdin
 _default_output = io_stdout
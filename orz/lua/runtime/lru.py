@@ -0,0 +1,42 @@
+from __future__ import absolute_import
+
+from itertools import count
+
+
+class LRUCache(object):
+    """bounded cache of make(*key), dropping the least recently used
+
+    A hit costs a dict lookup and the store of a tick, the search for
+    the least recently used entry is only done when a miss finds the
+    cache full.
+    """
+
+    def __init__(self, make, size=64):
+        self.make = make
+        self.size = size
+        self.entries = {}
+        self.tick = count().next
+
+
+    def __call__(self, *key):
+        entry = self.entries.get(key, None)
+
+        if entry is None:
+            value = self.make(*key)
+
+            if len(self.entries) >= self.size:
+                self.evict()
+
+            entry = self.entries[key] = [value, 0]
+
+        entry[1] = self.tick()
+        return entry[0]
+
+
+    def evict(self):
+        key = min(self.entries, key=lambda key: self.entries[key][1])
+        del self.entries[key]
+
+
+    def clear(self):
+        self.entries.clear()
@@ -116,15 +116,15 @@ def os_time(table=None):
         return math.floor(time.time())
 
     return time.mktime(
-        ( int(to_number(table.data["year"])),
-          int(to_number(table.data["month"])),
-          int(to_number(table.data["day"])),
-          int(to_number(table.data.get("hour", 12.0))),
-          int(to_number(table.data.get("min", 0.0))),
-          int(to_number(table.data.get("sec", 0.0))),
+        ( int(to_number(table["year"])),
+          int(to_number(table["month"])),
+          int(to_number(table["day"])),
+          int(to_number(table.get("hour", 12.0))),
+          int(to_number(table.get("min", 0.0))),
+          int(to_number(table.get("sec", 0.0))),
           0,
           0,
-          int(to_number(table.data.get("isdst", -1.0)))))
+          int(to_number(table.get("isdst", -1.0)))))
 
 
 
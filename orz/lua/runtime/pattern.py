@@ -0,0 +1,565 @@
+from __future__ import absolute_import
+
+from itertools import imap
+from operator import methodcaller
+import re
+import string
+
+from .lru import LRUCache
+
+
+# Lua patterns are compiled into a list of items, following lstrlib.c.
+# Where Python regular expressions can express every item, the items
+# are translated into a regular expression, which matches them with the
+# same backtracking order as Lua does. Otherwise, for %b and for %f
+# with a set containing '\0', the items are run by Matcher.
+
+SINGLE, OPEN, POSITION, CLOSE, BALANCE, FRONTIER, BACKREF, END = range(8)
+
+MAXCAPTURES = 32
+
+ALL = frozenset(map(chr, range(256)))
+
+CLASSES = {
+    'a': frozenset(string.ascii_letters),
+    'c': frozenset(map(chr, range(32)) + ['\x7f']),
+    'd': frozenset(string.digits),
+    'g': frozenset(map(chr, range(33, 127))),
+    'l': frozenset(string.ascii_lowercase),
+    'p': frozenset(string.punctuation),
+    's': frozenset(' \t\n\r\f\v'),
+    'u': frozenset(string.ascii_uppercase),
+    'w': frozenset(string.ascii_letters + string.digits),
+    'x': frozenset(string.hexdigits),
+    # deprecated in 5.2, but still there
+    'z': frozenset('\0'),
+}
+
+QUANTIFIERS = {
+    '':  '',
+    '*': '*',
+    '+': '+',
+    '-': '*?',
+    '?': '?',
+}
+
+
+def class_of(c):
+    chars = CLASSES.get(c.lower(), None)
+
+    if chars is None:
+        return frozenset(c)
+
+    if c.isupper():
+        return ALL - chars
+
+    return chars
+
+
+def parse_set(p, i):
+    # p[i] is '['
+    i += 1
+    negate = p[i:i+1] == '^'
+    if negate:
+        i += 1
+
+    chars = set()
+    first = True
+
+    while True:
+        if i >= len(p):
+            raise ValueError("malformed pattern (missing ']')")
+
+        c = p[i]
+
+        if c == ']' and not first:
+            i += 1
+            break
+
+        first = False
+
+        if c == '%':
+            if i + 1 >= len(p):
+                raise ValueError("malformed pattern (missing ']')")
+
+            chars |= class_of(p[i+1])
+            i += 2
+
+        elif p[i+1:i+2] == '-' and i + 2 < len(p) and p[i+2] != ']':
+            chars.update(map(chr, range(ord(c), ord(p[i+2]) + 1)))
+            i += 3
+
+        else:
+            chars.add(c)
+            i += 1
+
+    chars = frozenset(chars)
+
+    if negate:
+        chars = ALL - chars
+
+    return chars, i
+
+
+def parse_class(p, i):
+    c = p[i]
+
+    if c == '%':
+        if i + 1 >= len(p):
+            raise ValueError("malformed pattern (ends with '%')")
+
+        return class_of(p[i+1]), i + 2
+
+    if c == '[':
+        return parse_set(p, i)
+
+    if c == '.':
+        return ALL, i + 1
+
+    return frozenset(c), i + 1
+
+
+def parse(p, anchor=True):
+    """items of pattern p, and whether it is anchored
+
+    '^' is only an anchor at the start of p, and then only if anchor is
+    true, since gmatch takes it literally.
+    """
+    anchored = anchor and p.startswith('^')
+    i = 1 if anchored else 0
+
+    items = []
+    ncaptures = 0
+    unfinished = []
+
+    while i < len(p):
+        c = p[i]
+
+        if c == '(':
+            if ncaptures >= MAXCAPTURES:
+                raise ValueError("too many captures")
+
+            if p[i+1:i+2] == ')':
+                items.append((POSITION,))
+                i += 2
+            else:
+                items.append((OPEN,))
+                unfinished.append(ncaptures)
+                i += 1
+
+            ncaptures += 1
+            continue
+
+        if c == ')':
+            if not unfinished:
+                raise ValueError("invalid pattern capture")
+
+            unfinished.pop()
+            items.append((CLOSE,))
+            i += 1
+            continue
+
+        if c == '$' and i + 1 == len(p):
+            items.append((END,))
+            i += 1
+            continue
+
+        if c == '%' and i + 1 < len(p):
+            d = p[i+1]
+
+            if d == 'b':
+                if i + 3 >= len(p):
+                    raise ValueError("malformed pattern (missing arguments to '%b')")
+
+                items.append((BALANCE, p[i+2], p[i+3]))
+                i += 4
+                continue
+
+            if d == 'f':
+                i += 2
+                if p[i:i+1] != '[':
+                    raise ValueError("missing '[' after '%f' in pattern")
+
+                chars, i = parse_set(p, i)
+                items.append((FRONTIER, chars))
+                continue
+
+            if d.isdigit():
+                l = int(d) - 1
+
+                if l < 0 or l >= ncaptures or l in unfinished:
+                    raise ValueError("invalid capture index %%%d" % (l + 1))
+
+                items.append((BACKREF, l))
+                i += 2
+                continue
+
+        chars, i = parse_class(p, i)
+
+        q = p[i:i+1]
+        if q in ('*', '+', '-', '?') and q:
+            i += 1
+        else:
+            q = ''
+
+        items.append((SINGLE, chars, q))
+
+    if unfinished:
+        raise ValueError("unfinished capture")
+
+    return items, anchored
+
+
+def regex_set(chars):
+    if len(chars) == len(ALL):
+        return '.'
+
+    negate = len(chars) > len(ALL) // 2
+    if negate:
+        chars = ALL - chars
+
+    codes = sorted(map(ord, chars))
+    ranges = []
+
+    for code in codes:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+
+    parts = ''.join(
+        '\\x%02x' % first if first == last else '\\x%02x-\\x%02x' % (first, last)
+        for first, last in ranges)
+
+    if not negate and len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+        return parts
+
+    return '[%s%s]' % ('^' if negate else '', parts)
+
+
+def to_regex(items, whole=False):
+    """regular expression matching like items, or None
+
+    If whole is true, the whole match is made its first group.
+    """
+    captures = [ item[0] for item in items if item[0] in (OPEN, POSITION) ]
+
+    parts = []
+
+    for item in items:
+        kind = item[0]
+
+        if kind is SINGLE:
+            parts.append(regex_set(item[1]) + QUANTIFIERS[item[2]])
+        elif kind is OPEN:
+            parts.append('(')
+        elif kind is POSITION:
+            parts.append('()')
+        elif kind is CLOSE:
+            parts.append(')')
+        elif kind is FRONTIER:
+            if '\0' in item[1]:
+                return
+
+            chars = regex_set(item[1])
+            parts.append('(?<!%s)(?=%s)' % (chars, chars))
+        elif kind is BACKREF:
+            if captures[item[1]] is POSITION:
+                return
+
+            parts.append('(?:\\%d)' % (item[1] + 1))
+        elif kind is END:
+            parts.append('\\Z')
+        else:
+            return
+
+    regex = ''.join(parts)
+    if whole:
+        regex = '(%s)' % regex
+
+    return re.compile(regex, re.DOTALL)
+
+
+class MatchResult(object):
+    """the part of the interface of re match objects used by LuaPattern"""
+
+    def __init__(self, string, start, end, captures):
+        self.string = string
+        self._start = start
+        self._end = end
+        self.captures = captures
+
+
+    def start(self, group=0):
+        if group == 0:
+            return self._start
+
+        return self.captures[group-1][0]
+
+
+    def end(self):
+        return self._end
+
+
+    def span(self):
+        return self._start, self._end
+
+
+    def group(self, group=0):
+        if group == 0:
+            return self.string[self._start:self._end]
+
+        start, length = self.captures[group-1]
+        return self.string[start:start+length]
+
+
+    def groups(self):
+        return tuple(self.group(group) for group in xrange(1, len(self.captures) + 1))
+
+
+class Matcher(object):
+    """backtracking matcher of the items of a pattern, as in lstrlib.c"""
+
+    UNFINISHED = -1
+    POSITION = -2
+
+    def __init__(self, items):
+        self.items = items
+
+
+    def match(self, s, pos=0):
+        captures = []
+        end = self.do_match(s, pos, 0, captures)
+
+        if end >= 0:
+            return MatchResult(s, pos, end, captures)
+
+
+    def search(self, s, pos=0):
+        for start in xrange(pos, len(s) + 1):
+            m = self.match(s, start)
+            if m is not None:
+                return m
+
+
+    def do_match(self, s, i, k, captures):
+        items = self.items
+        end = len(s)
+
+        while k < len(items):
+            item = items[k]
+            kind = item[0]
+
+            if kind is SINGLE:
+                _, chars, q = item
+
+                if q == '':
+                    if i < end and s[i] in chars:
+                        i += 1
+                        k += 1
+                        continue
+
+                    return -1
+
+                if q == '?':
+                    if i < end and s[i] in chars:
+                        r = self.do_match(s, i + 1, k + 1, captures)
+                        if r >= 0:
+                            return r
+
+                    k += 1
+                    continue
+
+                if q == '-':
+                    while True:
+                        r = self.do_match(s, i, k + 1, captures)
+                        if r >= 0:
+                            return r
+
+                        if i < end and s[i] in chars:
+                            i += 1
+                        else:
+                            return -1
+
+                # '*' and '+' take as many as possible, then give back
+                j = i
+                while j < end and s[j] in chars:
+                    j += 1
+
+                least = i + 1 if q == '+' else i
+
+                while j >= least:
+                    r = self.do_match(s, j, k + 1, captures)
+                    if r >= 0:
+                        return r
+                    j -= 1
+
+                return -1
+
+            if kind is OPEN or kind is POSITION:
+                captures.append([i, self.UNFINISHED if kind is OPEN else self.POSITION])
+                r = self.do_match(s, i, k + 1, captures)
+                if r < 0:
+                    captures.pop()
+                return r
+
+            if kind is CLOSE:
+                capture = [ c for c in captures if c[1] == self.UNFINISHED ][-1]
+                capture[1] = i - capture[0]
+                r = self.do_match(s, i, k + 1, captures)
+                if r < 0:
+                    capture[1] = self.UNFINISHED
+                return r
+
+            if kind is BALANCE:
+                _, opening, closing = item
+
+                if i >= end or s[i] != opening:
+                    return -1
+
+                depth = 1
+                j = i + 1
+
+                while j < end:
+                    c = s[j]
+
+                    if c == closing:
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    elif c == opening:
+                        depth += 1
+
+                    j += 1
+                else:
+                    return -1
+
+                i = j + 1
+                k += 1
+                continue
+
+            if kind is FRONTIER:
+                previous = s[i-1] if i > 0 else '\0'
+                current = s[i] if i < end else '\0'
+
+                if previous in item[1] or current not in item[1]:
+                    return -1
+
+                k += 1
+                continue
+
+            if kind is BACKREF:
+                start, length = captures[item[1]]
+                if length == self.POSITION:
+                    raise ValueError("invalid capture index")
+
+                capture = s[start:start+length]
+                if not s.startswith(capture, i):
+                    return -1
+
+                i += len(capture)
+                k += 1
+                continue
+
+            if kind is END:
+                return i if i == end else -1
+
+        return i
+
+
+class LuaPattern(object):
+    """compiled Lua pattern
+
+    program is a compiled regular expression, or a Matcher with the
+    same match and search methods, and captures(m) are the values Lua
+    gets for a match m of program: the whole match if the pattern has
+    no capture, and positions starting from 1 for position captures.
+    """
+
+    def __init__(self, pattern, anchor=True):
+        items, self.anchored = parse(pattern, anchor)
+
+        kinds = [ item[0] for item in items ]
+        self.ncaptures = kinds.count(OPEN) + kinds.count(POSITION)
+        self.positions = [
+            group
+            for group, kind in enumerate(
+                (kind for kind in kinds if kind in (OPEN, POSITION)), 1)
+            if kind is POSITION ]
+
+        # whether some match may be empty, as then gsub and gmatch have
+        # to step over it themselves
+        self.nullable = not any(
+            (item[0] is SINGLE and item[2] in ('', '+')) or item[0] is BALANCE
+            for item in items)
+
+        # with no capture, the whole match is made a group, so that the
+        # values of all matches are the groups of re
+        self.regex = to_regex(items, self.ncaptures == 0)
+        self.program = self.regex or Matcher(items)
+        self.captures = self.make_captures()
+
+
+    def make_captures(self):
+        if self.regex is not None and not self.positions:
+            return methodcaller('groups')
+
+        if self.ncaptures == 0:
+            def captures(m):
+                return (m.group(),)
+
+        elif not self.positions:
+            def captures(m):
+                return m.groups()
+
+        else:
+            positions = self.positions
+
+            def captures(m):
+                values = list(m.groups())
+                for group in positions:
+                    values[group-1] = float(m.start(group) + 1)
+                return tuple(values)
+
+        return captures
+
+
+    def first(self, s, pos):
+        """first match in s at or after pos, only at pos if anchored"""
+        if self.anchored:
+            return self.program.match(s, pos)
+
+        return self.program.search(s, pos)
+
+
+    def gmatch(self, s):
+        """values of the matches of s as gmatch sees them"""
+        return imap(self.captures, self.finditer(s))
+
+
+    def finditer(self, s):
+        """matches of s as gmatch sees them"""
+        if not self.nullable and self.regex is not None:
+            return self.regex.finditer(s)
+
+        return self._finditer(s)
+
+
+    def _finditer(self, s):
+        search = self.program.search
+        end = len(s)
+        pos = 0
+
+        while pos <= end:
+            m = search(s, pos)
+            if m is None:
+                return
+
+            start, pos = m.span()
+            if pos == start:
+                pos += 1
+
+            yield m
+
+
+get_pattern = LRUCache(LuaPattern, 64)
@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+
+from .builtins import LuaTable, _lua, concat_n, to_string
+from .string import string_format
+
+
+def to_piece(v):
+    if isinstance(v, LuaBuffer):
+        return buf_tostring(v)
+
+    return to_string(v)
+
+
+def buf_put(buf, *args):
+    # the arguments are joined as by .., buffers through __concat. This
+    # is the call in the loops building strings, it returns its Lua
+    # values itself instead of going through _lua
+    s = concat_n(*args)
+
+    if s.__class__ is not str:
+        s = to_piece(s)
+
+    buf._pieces.append(s)
+    return (buf,)
+
+
+def buf_putf(buf, format, *args):
+    buf._pieces.append(string_format(format, *args)[0])
+    return buf
+
+
+def buf_tostring(buf):
+    # the pieces are joined once, and kept as a single piece
+    pieces = buf._pieces
+    s = ''.join(pieces)
+
+    if len(pieces) > 1:
+        pieces[:] = [s]
+
+    return s
+
+
+def buf_reset(buf):
+    del buf._pieces[:]
+    return buf
+
+
+def buf_len(buf):
+    return len(buf_tostring(buf))
+
+
+def buf_concat(op1, op2):
+    return to_piece(op1) + to_piece(op2)
+
+
+_buffer_metatable = LuaTable({
+    'put':         buf_put,
+    'putf':        _lua(1)(buf_putf),
+    'tostring':    _lua(1)(buf_tostring),
+    'reset':       _lua(1)(buf_reset),
+    '__tostring':  _lua(1)(buf_tostring),
+    '__len':       _lua(1)(buf_len),
+    '__concat':    _lua(1)(buf_concat),
+    })
+
+_buffer_metatable.rawset('__index', _buffer_metatable)
+
+
+class LuaBuffer(LuaTable):
+    """string buffer, appending pieces to a list joined on demand"""
+    __slots__ = ('_pieces',)
+
+    def __init__(self):
+        LuaTable.__init__(self)
+        self._pieces = []
+        self._metatable = _buffer_metatable
+
+    def __missing__(self, name):
+        # nothing is stored in a buffer, all it has are its methods
+        return _buffer_metatable.get(name, None)
+
+
+def strbuf_new(*args):
+    buf = LuaBuffer()
+    buf_put(buf, *args)
+    return buf
+
+
+mod_strbuf = LuaTable({
+    'new':       _lua(1)(strbuf_new),
+    'put':       _buffer_metatable['put'],
+    'putf':      _buffer_metatable['putf'],
+    'tostring':  _buffer_metatable['tostring'],
+    'reset':     _buffer_metatable['reset'],
+})
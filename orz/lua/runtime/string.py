@@ -1,8 +1,11 @@
 from __future__ import absolute_import
 
+from itertools import izip
 import re
 
-from .builtins import LuaTable, _lua, to_number, to_string
+from .builtins import LuaTable, LuaIterator, NUMBER_TYPES, _lua, _type, first_value, is_true, to_number, to_string, tostring
+from .lru import LRUCache
+from .pattern import get_pattern
 
 
 def string_byte(s, i=1.0, j=1.0):
@@ -17,48 +20,360 @@ def string_char(*args):
     return ''.join(map(chr, args))
 
 
+def find_init(init, l):
+    """index in a string of length l to start at, or None past its end"""
+    init = int(to_number(init))
+
+    if init < 0:
+        init += l + 1
+
+    if init > l + 1:
+        return
+
+    return max(init, 1) - 1
+
+
+# search of the characters making a pattern more than a plain string
+specials = re.compile(r'[\^$*+?.(\[%-]').search
+
+
+def string_find(s, pattern, init=1.0, plain=None):
+    s = to_string(s)
+    pattern = to_string(pattern)
+    init = find_init(init, len(s))
+
+    if init is None:
+        return (None,)
+
+    if is_true(plain) or specials(pattern) is None:
+        start = s.find(pattern, init)
+        if start < 0:
+            return (None,)
+
+        return (float(start + 1), float(start + len(pattern)))
+
+    pattern = get_pattern(pattern)
+    m = pattern.first(s, init)
+    if m is None:
+        return (None,)
+
+    start, end = m.span()
+    if pattern.ncaptures == 0:
+        return (float(start + 1), float(end))
+
+    return (float(start + 1), float(end)) + pattern.captures(m)
+
+
+def format_integer(v):
+    n = to_number(v)
+
+    try:
+        i = int(n)
+    except (OverflowError, ValueError):
+        i = None
+
+    if i is None or not -1 < n - i < 1:
+        raise ValueError("bad argument to 'format' (not a number in proper range)")
+
+    return i
+
+
+def format_unsigned(v):
+    return format_integer(v) % 2**64
+
+
+def format_char(v):
+    return format_integer(v) % 256
+
+
+def format_float(v):
+    return float(to_number(v))
+
+
+QUOTED_RE = re.compile(r'["\\\n]|([\x00-\x1f\x7f])(\d?)')
+
+
+def quote_char(m):
+    c, digit = m.groups()
+
+    if c is None:
+        return '\\' + m.group()
+
+    if digit:
+        return '\\%03d%s' % (ord(c), digit)
+
+    return '\\%d' % ord(c)
+
+
+def format_quoted(v):
+    return '"%s"' % QUOTED_RE.sub(quote_char, to_string(v))
+
+
+# conversions of string.format, as the conversions of Python formatting
+# they are turned into, the class of the arguments it takes as they are,
+# and the function converting the other arguments
+CONVERSIONS = {
+    'c': ('c', None,  format_char),
+    'd': ('d', int,   format_integer),
+    'i': ('i', int,   format_integer),
+    'o': ('o', None,  format_unsigned),
+    'u': ('d', None,  format_unsigned),
+    'x': ('x', None,  format_unsigned),
+    'X': ('X', None,  format_unsigned),
+    'e': ('e', float, format_float),
+    'E': ('E', float, format_float),
+    'f': ('f', float, format_float),
+    'g': ('g', float, format_float),
+    'G': ('G', float, format_float),
+    'q': ('s', None,  format_quoted),
+    's': ('s', str,   tostring),
+}
+
+FORMAT_SPEC_RE = re.compile(r'%([-+ #0]*)(\d*)(?:\.(\d*))?(.?)', re.DOTALL)
+
+
+def parse_format(format):
+    """Python format string doing what the Lua format string does, the
+    classes of the arguments it takes as they are, and the classes and
+    converters of its arguments"""
+    template = []
+    converters = []
+    pos = 0
+
+    while True:
+        i = format.find('%', pos)
+
+        if i < 0:
+            template.append(format[pos:])
+            break
+
+        template.append(format[pos:i])
+
+        if format[i+1:i+2] == '%':
+            template.append('%%')
+            pos = i + 2
+            continue
+
+        m = FORMAT_SPEC_RE.match(format, i)
+        flags, width, precision, option = m.groups()
+
+        if len(flags) > 5:
+            raise ValueError("invalid format (repeated flags)")
+
+        if len(width) > 2 or len(precision or '') > 2:
+            raise ValueError("invalid format (width or precision too long)")
+
+        if option not in CONVERSIONS:
+            raise ValueError("invalid option '%%%s' to 'format'" % option)
+
+        conversion, native, converter = CONVERSIONS[option]
+
+        if option == 'q':
+            template.append('%s')
+        else:
+            template.append(m.group()[:-1] + conversion)
+
+        converters.append((native, converter))
+        pos = m.end()
+
+    return ''.join(template), [ native for native, _ in converters ], tuple(converters)
+
+
+# parsed formats, all dropped when full as the re module does with its
+# patterns: a hit is then a single dict lookup, which string_format does
+# itself, without the bookkeeping of an LRUCache
+FORMATS = {}
+FORMATS_SIZE = 64
+
+
+def get_format(format):
+    parsed = FORMATS.get(format, None)
+
+    if parsed is None:
+        if len(FORMATS) >= FORMATS_SIZE:
+            FORMATS.clear()
+
+        parsed = FORMATS[format] = parse_format(format)
+
+    return parsed
+
+
 def string_format(format, *args):
-    return to_string(format)%args
+    if format.__class__ is not str:
+        format = to_string(format)
+
+    template, natives, converters = FORMATS.get(format, None) or get_format(format)
+
+    # arguments all of the classes taken as they are, and no extra ones,
+    # are formatted without going through the converters
+    if map(type, args) == natives:
+        return (template % args,)
+
+    if len(args) < len(converters):
+        raise ValueError("bad argument #%d to 'format' (no value)" % (len(args) + 2))
+
+    return (template % tuple([
+        arg if arg.__class__ is native else convert(arg)
+        for (native, convert), arg in izip(converters, args) ]),)
 
 
 def string_gmatch(s, pattern):
-    it = re.finditer(to_string(pattern), to_string(s))
+    pattern = get_pattern(to_string(pattern), False)
+    return LuaIterator(pattern.gmatch(to_string(s))), None, None
+
+
+def parse_replacement(repl, ncaptures):
+    """pieces of a replacement string, capture numbers for %1 to %9"""
+    pieces = []
+    i = 0
+
+    while True:
+        j = repl.find('%', i)
+
+        if j < 0 or j + 1 == len(repl):
+            pieces.append(repl[i:])
+            break
+
+        pieces.append(repl[i:j])
+        c = repl[j+1]
+
+        if c.isdigit():
+            n = int(c)
+
+            if n > max(ncaptures, 1):
+                raise ValueError("invalid capture index %%%d in replacement string" % n)
+
+            pieces.append(n)
+
+        elif c == '%':
+            pieces.append(c)
+
+        else:
+            raise ValueError("invalid use of '%' in replacement string")
+
+        i = j + 2
+
+    return [ piece for piece in pieces if piece != '' ]
+
+
+def to_template(repl, ncaptures):
+    """replacement string as a template of re.sub"""
+    pieces = parse_replacement(repl, ncaptures)
+
+    return ''.join(
+        piece.replace('\\', '\\\\')
+        if isinstance(piece, str)
+        else '\\g<%d>' % (piece if ncaptures else 0)
+        for piece in pieces)
+
 
-    @_lua(1)
-    def f(s, var):
-        try:
-            return it.next().group(0)
-        except StopIteration:
-            return
+get_template = LRUCache(to_template, 64)
 
-    return f, None, None
+
+def make_replace(pattern, repl):
+    """function of a match returning its replacement"""
+    captures = pattern.captures
+
+    if isinstance(repl, LuaTable):
+        def value(m):
+            return repl[captures(m)[0]]
+
+    elif isinstance(repl, str) or repl.__class__ in NUMBER_TYPES:
+        pieces = parse_replacement(to_string(repl), pattern.ncaptures)
+
+        def replace(m):
+            values = None
+            result = []
+
+            for piece in pieces:
+                if isinstance(piece, str):
+                    result.append(piece)
+                elif piece == 0:
+                    result.append(m.group())
+                else:
+                    values = values or captures(m)
+                    result.append(to_string(values[piece - 1]))
+
+            return ''.join(result)
+
+        return replace
+
+    else:
+        def value(m):
+            return first_value(repl(*captures(m)))
+
+    def replace(m):
+        v = value(m)
+
+        if v is None or v is False:
+            return m.group()
+
+        if isinstance(v, str):
+            return v
+
+        if v.__class__ in NUMBER_TYPES:
+            return to_string(v)
+
+        raise TypeError("invalid replacement value (a %s)" % _type(v))
+
+    return replace
 
 
 def string_gsub(s, pattern, repl, n=None):
     s = to_string(s)
-    pattern = to_string(pattern)
+    pattern = get_pattern(to_string(pattern))
 
-    if n is not None:
-        n = to_number(n)
-        n = int(n)
+    if n is None:
+        n = len(s) + 1
+    else:
+        n = int(to_number(n))
 
-        if n == 0:
-            return s, 0.0
+    if n <= 0:
+        return s, 0.0
 
-    if isinstance(repl, str):
-        replace = repl
+    regex = pattern.regex
 
-    elif isinstance(repl, LuaTable):
-        def replace(match):
-            return repl[match.group(1)]
+    # with no empty match, re.subn replaces the same matches as Lua does
+    if regex is not None and not pattern.nullable and not pattern.anchored:
+        if isinstance(repl, str) and not pattern.positions:
+            repl = get_template(repl, pattern.ncaptures)
+        else:
+            repl = make_replace(pattern, repl)
 
-    else:
-        def replace(match):
-            groups = match.groups() or (match.group(0),)
-            return repl(*groups)
+        s, n = regex.subn(repl, s, n)
+        return s, float(n)
+
+    replace = make_replace(pattern, repl)
+    first = pattern.first
+    end = len(s)
+    pos = 0
+    count = 0
+    result = []
+
+    while count < n:
+        m = first(s, pos)
+        if m is None:
+            break
+
+        start, stop = m.span()
+        result.append(s[pos:start])
+        result.append(replace(m))
+        count += 1
 
-    s, n = re.subn(pattern, replace, s, n or 0)
-    return s, float(n)
+        if stop > start:
+            pos = stop
+        elif start < end:
+            result.append(s[start])
+            pos = start + 1
+        else:
+            pos = start
+            break
+
+        if pattern.anchored:
+            break
+
+    result.append(s[pos:])
+    return ''.join(result), float(count)
 
 
 def string_len(s):
@@ -69,23 +384,19 @@ def string_lower(s):
     return to_string(s).lower()
 
 
-def string_match(s, pattern, i=1.0):
+def string_match(s, pattern, init=1.0):
     s = to_string(s)
-    pattern = to_string(pattern)
-    i = int(to_number(i))
+    pattern = get_pattern(to_string(pattern))
+    init = find_init(init, len(s))
 
-    l = len(s)
+    if init is None:
+        return (None,)
 
-    i += l+1 if i<0 else 0
-    i = i or 1
-
-    s = s[i:]
-
-    match = re.match(pattern, s)
-    if match is None:
-        return
+    m = pattern.first(s, init)
+    if m is None:
+        return (None,)
 
-    return match.group(0)
+    return pattern.captures(m)
 
 
 def string_rep(s, n, sep=None):
@@ -116,12 +427,13 @@ def string_upper(s):
 mod_string = LuaTable({
     'byte':     _lua()(string_byte),
     'char':     _lua(1)(string_char),
-    'format':   _lua(1)(string_format),
+    'find':     string_find,
+    'format':   string_format,
     'gmatch':   string_gmatch,
     'gsub':     string_gsub,
     'len':      _lua(1)(string_len),
     'lower':    _lua(1)(string_lower),
-    'match':    _lua(1)(string_match),
+    'match':    string_match,
     'rep':      _lua(1)(string_rep),
     'reverse':  _lua(1)(string_reverse),
     'sub':      _lua(1)(string_sub),
@@ -1,6 +1,6 @@
 from __future__ import absolute_import
 
-from .builtins import LuaTable, _lua, lt_event, _slice, to_string, to_number
+from .builtins import LuaTable, NUMBER_TYPES, _lua, lt_event, _slice, to_string, to_number
 
 
 def table_concat(table, sep="", i=1.0, j=-1.0):
@@ -13,41 +13,91 @@ def table_concat(table, sep="", i=1.0, j=-1.0):
 
 
 def table_insert(table, value, pos=None):
-    length = len(table)
+    lst = table.list
 
-    if pos is not None:
-        pos, value = value, int(to_number(pos)) - 1
+    if pos is None:
+        if value is not None:
+            lst.append(value)
     else:
-        pos = length
+        pos, value = int(to_number(value)), pos
+
+        if not 1 <= pos <= len(lst) + 1:
+            raise IndexError("position out of bounds")
+
+        lst.insert(pos - 1, value)
+        table._strip_list()
 
-    table.list.insert(pos, value)
+    table._propagate_list()
 
 
 def table_pack(*args):
     table = LuaTable()
     table.list = list(args)
-    table.data["n"] = len(args)
+    table._strip_list()
+    table["n"] = float(len(args))
     return table
 
 
 def table_remove(table, pos=None):
+    lst = table.list
+
     if pos is None:
-        pos = len(table) - 1
+        pos = len(lst)
     else:
-        pos = int(to_number(pos)) - 1
+        pos = int(to_number(pos))
+
+    if not 1 <= pos <= len(lst):
+        return
+
+    value = lst.pop(pos - 1)
+    table._strip_list()
+    return value
+
+
+# list.sort only ever asks whether cmp(a, b) < 0, so that the result of
+# a single comparison with < is enough, where a full cmp would need a
+# second one to tell equal values from greater ones.
+
+def lt_cmp(op1, op2):
+    return -lt_event(op1, op2)
 
-    if 0<= pos < len(table):
-        table.list.pop(pos)
+
+def comp_cmp(comp):
+
+    def cmp(op1, op2):
+        values = comp(op1, op2)
+
+        if values and values[0] is not False and values[0] is not None:
+            return -1
+
+        return 0
+
+    return cmp
+
+
+NATIVE_ORDERED = (
+    frozenset(NUMBER_TYPES),
+    frozenset([str]),
+)
 
 
 def table_sort(table, comp=None):
-    if comp is None:
-        table.list.sort(cmp=lt_event)
+    lst = table.list
+
+    if comp is not None:
+        lst.sort(comp_cmp(comp))
+        return
+
+    # arrays of numbers only or of strings only are sorted by the
+    # comparisons of Python, which agree with those of Lua for them
+    types = frozenset(map(type, lst))
 
-    def wrapper(op1, op2):
-        return comp(op1, op2)[0]
+    for native in NATIVE_ORDERED:
+        if types <= native:
+            lst.sort()
+            return
 
-    table.list.sort(wrapper)
+    lst.sort(lt_cmp)
 
 
 def table_unpack(table, i=1.0, j=-1.0):
@@ -61,7 +111,7 @@ mod_table = LuaTable({
     'concat':  _lua(1)(table_concat),
     'insert':  _lua(0)(table_insert),
     'pack':    _lua(1)(table_pack),
-    'remove':  _lua(0)(table_remove),
+    'remove':  _lua(1)(table_remove),
     'sort':    _lua(0)(table_sort),
     'unpack':  _lua()(table_unpack),
 })
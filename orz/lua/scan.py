@@ -0,0 +1,254 @@
+import re
+
+from ply.lex import LexToken
+
+
+class Scanner(object):
+    """hand written replacement of the PLY lexer of orz.lua.parse.Parser
+
+    Instead of trying the master regular expression of PLY, the next
+    token is chosen by its first character. The regular expressions of
+    the token rules of the parser are reused, as well as the functions
+    of STRING and LONGSTRING, so that the tokens, line numbers and the
+    lexer positions seen by yacc are exactly the same as with PLY.
+    """
+
+    # tokens of one character, which never start a longer one
+    SINGLE = {
+        '+': 'PLUS',
+        '*': 'TIMES',
+        '/': 'DIVIDE',
+        '^': 'POWER',
+        '%': 'MOD',
+        '#': 'LEN',
+        '(': '(',
+        ')': ')',
+        '{': '{',
+        '}': '}',
+        ']': ']',
+        ';': ';',
+        ',': ',',
+    }
+
+    # tokens starting with a character, which may start a longer one
+    DOUBLE = {
+        '<': {'<': 'LT', '<=': 'LE'},
+        '>': {'>': 'GT', '>=': 'GE'},
+        '=': {'=': '=', '==': 'EQ'},
+        '~': {'~=': 'NE'},
+        ':': {':': ':', '::': 'LABEL'},
+        '.': {'.': '.', '..': 'CONCAT', '...': 'ELLIPSIS'},
+    }
+
+    NAME_START = frozenset(
+        'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+    DIGITS = frozenset('0123456789')
+
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.lexdata = None
+        self.lexpos = 0
+        self.lineno = 1
+
+        rules = self._compile(parser.__class__)
+        self.name_re, self.number_re, self.string_re, self.longstring_re, self.long_comment_re, self.shebang_re = rules
+
+        self.reserved = dict((r, r.upper()) for r in parser.reserved)
+        self.literals = frozenset(parser.literals)
+
+
+    _compiled = {}
+
+    @classmethod
+    def _compile(cls, parser_class):
+        rules = cls._compiled.get(parser_class, None)
+
+        if rules is None:
+            rules = tuple(
+                re.compile(regex, re.VERBOSE)
+                for regex in (
+                    parser_class.t_NAME.__doc__,
+                    parser_class.t_NUMBER,
+                    parser_class.t_STRING.__doc__,
+                    parser_class.t_LONGSTRING.__doc__,
+                    parser_class.t_ignore_long_comment.__doc__,
+                    parser_class.t_SHEBANG))
+
+            cls._compiled[parser_class] = rules
+
+        return rules
+
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        # yacc looks up lexer.token once per parse, after calling input()
+        self.token = self.scan(data).next
+
+
+    def token(self):
+        raise RuntimeError('No input string given with input()')
+
+
+    def _token(self, type, value, lineno, lexpos):
+        tok = LexToken()
+        tok.type = type
+        tok.value = value
+        tok.lineno = lineno
+        tok.lexpos = lexpos
+        return tok
+
+
+    def _call_rule(self, rule, type, value, lineno, lexpos):
+        # the rule functions may update lexer.lineno
+        tok = self._token(type, value, lineno, lexpos)
+        tok.lexer = self
+        self.lineno = lineno
+        return rule(tok)
+
+
+    def error(self, lineno, lexpos):
+        tok = self._token('error', self.lexdata[lexpos:], lineno, lexpos)
+        tok.lexer = self
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.parser.t_error(tok)
+        raise SyntaxError("Illegal character '%s'" % self.lexdata[lexpos])
+
+
+    def scan(self, data):
+        parser = self.parser
+        single = self.SINGLE
+        double = self.DOUBLE
+        reserved = self.reserved
+        literals = self.literals
+        name_start = self.NAME_START
+        digits = self.DIGITS
+        name_match = self.name_re.match
+        number_match = self.number_re.match
+
+        pos = 0
+        end = len(data)
+        lineno = self.lineno
+
+        m = self.shebang_re.match(data)
+        if m is not None:
+            pos = m.end()
+            self.lexpos = pos
+            yield self._token('SHEBANG', m.group(), lineno, 0)
+
+        while pos < end:
+            c = data[pos]
+
+            if c == ' ' or c == '\t':
+                pos += 1
+                continue
+
+            if c == '\n':
+                start = pos
+                pos += 1
+                while pos < end and data[pos] == '\n':
+                    pos += 1
+
+                lineno += pos - start
+                self.lineno = lineno
+                continue
+
+            tok = LexToken()
+            tok.lineno = lineno
+            tok.lexpos = pos
+
+            if c in name_start:
+                m = name_match(data, pos)
+                tok.value = value = m.group()
+                tok.type = reserved.get(value, 'NAME')
+                pos = m.end()
+
+            elif c in single:
+                tok.type = single[c]
+                tok.value = c
+                pos += 1
+
+            elif c in digits or (c == '.' and data[pos+1:pos+2] in digits):
+                m = number_match(data, pos)
+                tok.type = 'NUMBER'
+                tok.value = m.group()
+                pos = m.end()
+
+            elif c in double:
+                value = data[pos:pos+3]
+
+                if value != '...':
+                    value = value[:2]
+                    if value not in double[c]:
+                        value = c
+
+                tok.type = double[c].get(value, None)
+                tok.value = value
+
+                if tok.type is None:
+                    if c not in literals:
+                        self.error(lineno, pos)
+
+                    tok.type = c
+
+                pos += len(value)
+
+            elif c == '"' or c == "'":
+                m = self.string_re.match(data, pos)
+                if m is None:
+                    self.error(lineno, pos)
+
+                pos = m.end()
+                self.lexpos = pos
+                tok = self._call_rule(
+                    parser.t_STRING, 'STRING', m.group(), lineno, tok.lexpos)
+                lineno = self.lineno
+
+            elif c == '[':
+                m = self.longstring_re.match(data, pos)
+
+                if m is None:
+                    tok.type = tok.value = '['
+                    pos += 1
+                else:
+                    pos = m.end()
+                    self.lexpos = pos
+                    tok = self._call_rule(
+                        parser.t_LONGSTRING, 'LONGSTRING', m.group(), lineno, tok.lexpos)
+                    lineno = self.lineno
+
+            elif c == '-':
+                if data[pos+1:pos+2] != '-':
+                    tok.type = 'MINUS'
+                    tok.value = c
+                    pos += 1
+                else:
+                    m = self.long_comment_re.match(data, pos)
+
+                    if m is None:
+                        nl = data.find('\n', pos)
+                        pos = end if nl < 0 else nl
+                        continue
+
+                    pos = m.end()
+                    self.lexpos = pos
+                    self._call_rule(
+                        parser.t_ignore_long_comment, 'ignore_long_comment',
+                        m.group(), lineno, m.start())
+                    lineno = self.lineno
+                    continue
+
+            else:
+                self.error(lineno, pos)
+
+            self.lexpos = pos
+            yield tok
+
+        self.lineno = lineno
+
+        while True:
+            pos += 1
+            self.lexpos = pos
+            yield None
@@ -51,22 +51,26 @@ class SymbolTable(BaseSymbolTable):
     def __init__(self, parent=None):
         super(SymbolTable, self).__init__(parent)
         self.symbols = []
+        self.params = 0
 
         self._loopvars = []
 
 
     def close(self):
-        self.names, self.varnames, self.freevars, self.cellvars = calculate_slots(self.symbols)
+        self.names, self.varnames, self.freevars, self.cellvars = calculate_slots(self.symbols, self.params)
+
+
+    def discard(self, symbols):
+        # symbols compare equal by name, only these very ones are removed
+        discarded = set(map(id, symbols))
+        self.symbols = [s for s in self.symbols if id(s) not in discarded]
 
 
     def get_loopvar(self, n=0):
+        # the hidden local keeping the iterator of a for loop nested in n
+        # others, shared by the loops at the same depth
         if n >= len(self._loopvars):
-            loopvar = (
-                self.add_local(".{:d}a".format(n)),
-                self.add_local(".{:d}b".format(n)),
-                self.add_local(".{:d}c".format(n)))
-
-            self._loopvars.append(loopvar)
+            self._loopvars.append(self.add_local(".{:d}".format(n)))
 
         return self._loopvars[n]
 
@@ -149,6 +153,8 @@ def visit_function(env, node):
     else:
         symtable.declare_local('__...__')
 
+    symtable.params = len(node.args) + 1
+
     for subnode in node.body:
         visit(env(symtable=symtable), subnode)
 
@@ -227,11 +233,11 @@ def visit(env, node):
 
 @visit.match(ast.For)
 def visit(env, node):
-    node._validate_forloop = env.symtable.get_global("validate_forloop")
+    node._forloop_range = env.symtable.get_global("forloop_range")
 
-    visit(env.symtable, node.start)
-    visit(env.symtable, node.stop)
-    visit(env.symtable, node.step)
+    visit(env, node.start)
+    visit(env, node.stop)
+    visit(env, node.step)
 
     node._loopvar = env.symtable.get_loopvar()
 
@@ -246,6 +252,8 @@ def visit(env, node):
 
 @visit.match(ast.ForEach)
 def visit(env, node):
+    node._foreach_iter = env.symtable.get_global("foreach_iter")
+
     for subnode in node.iter:
         visit(env, subnode)
 
@@ -297,9 +305,29 @@ def visit(env, node):
     node.symbol = symbol
 
 
+def get_number_guard(symtable, *types):
+    # the attribute checked, then the classes taken by the opcode
+    return (symtable.get_attribute("__class__"),) + tuple(symtable.get_global(t) for t in types)
+
+
+def is_nil_comparison(node):
+    return node.op in ('==', '~=') and ast.NIL in (type(node.left), type(node.right))
+
+
 @visit.match(ast.BinOp)
 def visit(env, node):
-    node._op = env.symtable.get_global(".b"+node.op)
+    # comparisons with nil are compiled to identity checks, chains of ..
+    # to a single call of concat_n
+    if is_nil_comparison(node):
+        node._op = None
+    elif node.op == '..':
+        node._op = env.symtable.get_global("concat_n")
+    else:
+        node._op = env.symtable.get_global(".b"+node.op)
+
+    if node.op in ('+', '-', '*', '/', '%'):
+        node._guard = get_number_guard(env.symtable, ".number", ".float")
+
     visit(env, node.left)
     visit(env, node.right)
 
@@ -307,6 +335,10 @@ def visit(env, node):
 @visit.match(ast.UnaryOp)
 def visit(env, node):
     node._op = env.symtable.get_global(".u"+node.op)
+
+    if node.op == '-':
+        node._guard = get_number_guard(env.symtable, ".float")
+
     visit(env, node.operand)
 
 
@@ -323,6 +355,19 @@ def visit(env, node):
         visit(env, subnode)
 
 
+@visit.match(ast.Field)
+def visit(env, node):
+    # keys which may be true, false or zero are stored in the hash part
+    # under keys of their own, names of fields never are
+    if type(node.key) is ast.String:
+        node._hash_key = None
+    else:
+        node._hash_key = env.symtable.get_global(".key")
+
+    visit(env, node.key)
+    visit(env, node.value)
+
+
 visit.match(ast.Label)(nop)
 visit.match(ast.Goto)(nop)
 visit.match(ast.Assign)(default)
@@ -338,4 +383,3 @@ visit.match(ast.FALSE)(nop)
 visit.match(ast.TRUE)(nop)
 visit.match(ast.Number)(nop)
 visit.match(ast.String)(nop)
-visit.match(ast.Field)(default)
@@ -1,3 +1,4 @@
+import copy
 import os.path
 import sys
 from ply import lex, yacc
@@ -10,15 +11,56 @@ class SyntaxParser(object):
 
     def __init__(self, filename):
         self.filename = filename
-        self.tokens = [ r.upper() for r in self.reserved ] + [ a[2:] for a in dir(self) if a[:2] == 't_' and a[2:].isupper() ]
-        self.lexer = lex.lex(module=self, debug=False)
-        self.parser = yacc.yacc(
-            module=self,
+
+        # lexer and LALR tables are built once per class, and then shared
+        # by all instances, each of them only gets its own lexer state
+        tables = self.__class__.__dict__.get('_tables', None)
+        if tables is None:
+            tables = self.build_tables()
+
+        lexer, parser = tables
+
+        self.lexer = lexer.clone(self)
+        self.lexer.lexerrorf = self.t_error
+        self.parser = copy.copy(parser)
+        self.parser.errorfunc = self.p_error
+        self.parser.productions = [copy.copy(p) for p in parser.productions]
+
+        for p in self.parser.productions:
+            if p.func:
+                p.callable = getattr(self, p.func)
+
+
+    @classmethod
+    def build_tables(cls):
+        """build lexer and parser tables of this class
+
+        parser tables are written to the module parsetab in the package
+        of this class, which is imported instead next time, as long as the
+        grammar is left unchanged. When the package can not be written,
+        as once installed read only, they are built without a word in
+        every process.
+        """
+        module = sys.modules[cls.__module__]
+        package = cls.__module__.rpartition('.')[0]
+        outputdir = os.path.dirname(module.__file__)
+        writable = os.access(outputdir, os.W_OK)
+
+        instance = cls.__new__(cls)
+        instance.filename = '<tables>'
+        instance.tokens = [ r.upper() for r in cls.reserved ] + [ a[2:] for a in dir(cls) if a[:2] == 't_' and a[2:].isupper() ]
+
+        lexer = lex.lex(module=instance, debug=False)
+        parser = yacc.yacc(
+            module=instance,
             debug=False,
-            write_tables=False,
-            picklefile=os.path.splitext(
-                sys.modules[self.__class__.__module__].__file__
-                )[0]+'.parsetab')
+            tabmodule=(package + '.' if package else '') + 'parsetab',
+            outputdir=outputdir,
+            write_tables=writable,
+            errorlog=None if writable else yacc.NullLogger())
+
+        cls._tables = lexer, parser
+        return cls._tables
 
 
     def t_error(self, t):
@@ -32,6 +74,15 @@ class SyntaxParser(object):
 
 
     def p_error(self, p):
+        if p is None:
+            raise SyntaxError(
+                "Unexpected end of file",
+                ( self.filename,
+                  self.lexer.lineno,
+                  self.col_offset(len(self.lexer.lexdata)),
+                  self.lexer.lexdata[self.lexer.lexdata.rfind('\n')+1:]
+                ))
+
         raise SyntaxError(
             "Invalid Syntax",
             ( self.filename,
@@ -37,13 +37,14 @@ class Name(Symbol):
         return self.name == other.name
 
 
-def calculate_slots(symbols):
+def calculate_slots(symbols, params=0):
+    """slots of symbols, the first params of which are the parameters"""
     names = []
     varnames = []
     freevars = []
     cellvars = []
 
-    for symbol in symbols:
+    for index, symbol in enumerate(symbols):
         if isinstance(symbol, Global) or isinstance(symbol, Attribute):
             if symbol not in names:
                 names.append(Name(symbol.name))
@@ -57,6 +58,11 @@ def calculate_slots(symbols):
             if symbol.is_referenced:
                 slot = len(cellvars)
                 cellvars.append(symbol)
+
+                # a parameter keeps its position, CPython copies it into
+                # the cell of the same name
+                if index < params:
+                    varnames.append(symbol)
             else:
                 slot = len(varnames)
                 varnames.append(symbol)
@@ -19,6 +19,7 @@ setup(
     ],
 
     install_requires = ['ply'],
+    extras_require = {'array': ['numpy']},
 
     packages=['orz', 'orz.lua', 'orz.lua.runtime'],
 )
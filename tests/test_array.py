@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+from orz.lua.runtime import array, load
+
+
+@pytest.fixture(params=['array', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param not in array.BACKENDS:
+        pytest.skip("numpy is not installed")
+
+    monkeypatch.setattr(array, 'backend', array.BACKENDS[request.param]())
+    return request.param
+
+
+def run(source):
+    return load('local array = require("array")\n' + source)()
+
+
+def test_index(backend):
+    assert run("""
+    local a = array.new(3, 2)
+    a[2] = 5
+    return #a, a[1], a[2], a[3], a[0], a[4]
+    """) == (3, 2.0, 5.0, 2.0, None, None)
+
+
+def test_arithmetic(backend):
+    t, = run("""
+    local a = array.fromtable({1, 2, 3})
+    local b = array.fromtable({4, 5, 6})
+    return array.totable(-(a + b * 2 - 1) / 2 % 4 ^ a)
+    """)
+
+    assert t.list == [0.0, 10.5, 57.0]
+
+
+def test_reductions(backend):
+    assert run("""
+    local a = array.fromtable({3, -1, 2})
+    return array.sum(a), array.dot(a, a), array.min(a), array.max(a)
+    """) == (4.0, 14.0, -1.0, 3.0)
+
+
+def test_float_semantics(backend):
+    # as Lua on C doubles, nothing raises
+    t, = run("""
+    local a = array.fromtable({1, -1, 0, 10, -10, -8})
+    local t = {}
+    for _, x in ipairs({a / 0, a % 0, a ^ 400, a ^ 401, a ^ -1, a ^ 0.5, a % (1/0)}) do
+        for i = 1, #x do t[#t + 1] = x[i] end
+    end
+    return t
+    """)
+
+    inf, nan = float('inf'), float('nan')
+    expected = [
+        inf, -inf, nan, inf, -inf, -inf,
+        nan, nan, nan, nan, nan, nan,
+        1.0, 1.0, 0.0, inf, inf, inf,
+        1.0, -1.0, 0.0, inf, -inf, -inf,
+        1.0, -1.0, inf, 0.1, -0.1, -0.125,
+        1.0, nan, 0.0, math.sqrt(10), nan, nan,
+        nan, nan, nan, nan, nan, nan,
+    ]
+
+    assert len(t.list) == len(expected)
+    for value, e in zip(t.list, expected):
+        assert value == e or (value != value and e != e)
@@ -0,0 +1,20 @@
+import sys
+
+from orz.lua.runtime import cache, loadfile
+
+
+def test_cache_beside_luac(tmpdir, monkeypatch):
+    monkeypatch.setattr(cache, 'enabled', True)
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+
+    source = tmpdir.join('foo.lua')
+    source.write('return 1 + 1')
+    luac = tmpdir.join('foo.luac')
+    luac.write('\x1bLua')
+
+    assert loadfile(str(source))() == (2.0,)
+    assert loadfile(str(source))() == (2.0,)
+
+    assert luac.read() == '\x1bLua'
+    assert tmpdir.join('__pycache__', 'foo.luapyc').check(file=1)
+    assert cache.read_cache(str(source), cache.get_header(str(source)))
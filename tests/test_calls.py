@@ -0,0 +1,32 @@
+from orz.lua.runtime import load
+
+
+def run(source):
+    return load(source)()
+
+
+def test_first_value_indexed():
+    assert run("""
+    local function f() return {10, x = "y"}, 5 end
+    local function g() return 1, 2 end
+    local t = {"one"}
+    return f()[1], f().x, t[g()]
+    """) == (10.0, 'y', 'one')
+
+
+def test_method_of_first_value():
+    assert run("""
+    local o = {n = 0}
+    function o:f() self.n = self.n + 1 return self, "extra" end
+    return o:f():f():f().n
+    """) == (3.0,)
+
+
+def test_first_value_assigned_to():
+    assert run("""
+    local t = {}
+    local function f() return t, 5 end
+    f().x = 1
+    f()[2], f().y = 2, 3
+    return t.x, t[2], t.y
+    """) == (1.0, 2.0, 3.0)
@@ -0,0 +1,37 @@
+from orz.lua.runtime import load
+
+from test_fold import names
+
+
+def run(source):
+    return load(source)()
+
+
+CONCAT = """
+local seen = {}
+local t = setmetatable({}, {__concat = function(a, b)
+    seen[#seen + 1] = type(a) == "table" and "t" or a
+    seen[#seen + 1] = type(b) == "table" and "t" or b
+    return "r"
+end})
+"""
+
+
+def test_concat_metamethod_from_the_right():
+    assert run(CONCAT + """
+    local r = "a" .. "b" .. t
+    return r, seen[1], seen[2], #seen
+    """) == ('ar', 'b', 't', 2)
+
+
+def test_concat_constant_suffix():
+    assert run(CONCAT + """
+    local r = "a" .. t .. "b" .. 1 .. "c"
+    return r, seen[1], seen[2], #seen
+    """) == ('ar', 't', 'b1c', 2)
+
+
+def test_concat_constants_folded():
+    assert names('return "a" .. 1 .. "b", -1 .. 2') == set(['_ENV'])
+    assert run('return "a" .. 1 .. "b", -1 .. 2') == ('a1b', '-12')
+    assert 'concat_n' in names('return x .. "a" .. "b"')
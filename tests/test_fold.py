@@ -0,0 +1,31 @@
+import marshal
+
+from orz.lua.runtime import compile_lua, load
+
+
+def names(source):
+    code = marshal.loads(compile_lua(source))
+
+    def walk(code):
+        yield code.co_names
+        for const in code.co_consts:
+            if hasattr(const, 'co_names'):
+                for names in walk(const):
+                    yield names
+
+    return set(name for names in walk(code) for name in names)
+
+
+def test_folded_operators_leave_no_names():
+    source = """
+    local x = 1 + 2 * 3 - 4 / 2 % 3
+    local function f() return -(2 ^ 3), "a" .. 1, not nil, #"abc" end
+    return x, f()
+    """
+
+    assert names(source) == set(['_ENV'])
+    assert load(source)() == (5.0, -8.0, 'a1', True, 3)
+
+
+def test_guards_kept_for_operators_left():
+    assert set(['.b+', '__class__', '.number']) <= names("return x + (1 + 2)")
@@ -0,0 +1,31 @@
+from orz.lua.runtime import load
+from orz.lua.runtime import string
+
+
+def run(source):
+    return load(source)()
+
+
+def test_arguments_taken_as_they_are():
+    assert run("""
+    return string.format("%s: %5.2f", "row", 1.5), string.format("%d%%", #"abc")
+    """) == ('row:  1.50', '3%')
+
+
+def test_arguments_converted():
+    assert run("""
+    return string.format("%s %s %d", 100, 0.1 + 0.2, 3.0),
+        string.format("%5.1f|%x", "2.25", -1), string.format("%s", "a", "extra")
+    """) == ('100 0.3 3', '  2.2|ffffffffffffffff', 'a')
+
+
+def test_formats_dropped_when_full(monkeypatch):
+    monkeypatch.setattr(string, 'FORMATS', {})
+    monkeypatch.setattr(string, 'FORMATS_SIZE', 2)
+
+    assert run("""
+    local s = ""
+    for i = 1, 5 do s = s .. string.format("%d" .. string.rep("-", i), i) end
+    return s
+    """) == ('1-2--3---4----5-----',)
+    assert len(string.FORMATS) == 1
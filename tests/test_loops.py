@@ -0,0 +1,78 @@
+import marshal
+
+from orz.lua.runtime import compile_lua, load
+
+
+def run(source):
+    return load(source)()
+
+
+def hidden_locals(source, name):
+    def walk(code):
+        yield code
+        for const in code.co_consts:
+            if hasattr(const, 'co_code'):
+                for code in walk(const):
+                    yield code
+
+    for code in walk(marshal.loads(compile_lua(source))):
+        if code.co_name == name:
+            return [ v for v in code.co_varnames if v.startswith('.') ]
+
+
+def test_numeric_for_one_hidden_local():
+    source = """
+    local function f(n)
+        local s = 0
+        for i = 1, n do
+            for j = i, n, 2 do s = s + j end
+        end
+        for k = n, 1, -1 do s = s + k end
+        return s
+    end
+    return f(10)
+    """
+
+    assert hidden_locals(source, 'f') == ['.0', '.1']
+    assert run(source) == (260.0,)
+
+
+def test_generic_for_one_hidden_local():
+    source = """
+    local function f(t)
+        local s = 0
+        for i, v in ipairs(t) do
+            for k, w in pairs(t) do s = s + v * w end
+        end
+        for k in next, t do
+            if k > 2 then break end
+            s = s + k
+        end
+        return s
+    end
+    return f({1, 2, 3})
+    """
+
+    assert hidden_locals(source, 'f') == ['.0', '.1']
+    assert run(source) == (39.0,)
+
+
+def test_integral_counters_multiply_as_floats():
+    result, = run("for i = 94906267, 94906267 do return i * i end")
+
+    assert type(result) is float
+    assert result == 94906267.0 * 94906267.0
+
+
+def test_integral_counters_power_as_floats():
+    source = """
+    for i = 3, 3 do
+        for j = 40, 40 do return i ^ j == 3 ^ 40, i ^ j end
+    end
+    """
+
+    assert run(source) == (True, 3.0 ** 40)
+
+
+def test_integral_counters_negate_to_negative_zero():
+    assert run("for i = 0, 0 do return tostring(-i), tostring(-1 * i) end") == ('-0', '-0')
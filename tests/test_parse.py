@@ -0,0 +1,22 @@
+import os
+import sys
+
+from orz.lua import parse
+
+
+def test_tables_of_read_only_package(tmpdir, monkeypatch, capfd):
+    # the tables are built again, neither written nor complained about
+    monkeypatch.setattr(os, 'access', lambda path, mode: False)
+    monkeypatch.delattr(parse.Parser, '_tables', raising=False)
+    monkeypatch.setitem(sys.modules, 'orz.lua.parsetab', None)
+
+    written = []
+    monkeypatch.setattr(
+        'ply.yacc.LRGeneratedTable.write_table',
+        lambda *args, **kwargs: written.append(args))
+
+    tree = parse.Parser('<test>').parse('return 1')
+
+    assert tree.body
+    assert written == []
+    assert capfd.readouterr() == ('', '')
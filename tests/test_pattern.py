@@ -0,0 +1,20 @@
+from orz.lua.runtime import load
+
+
+def run(source):
+    return load(source)()
+
+
+def test_class_z():
+    assert run(r"""
+    local s = "a\0b\0"
+    return string.find(s, "%z"), string.match(s, "%Z+"),
+        string.gsub(s, "%z", "."), string.match(s, "^[%w%z]+$")
+    """) == (2.0, 'a', 'a.b.', 'a\0b\0')
+
+
+def test_class_z_balance():
+    # %b is run by the backtracking matcher, not by a regular expression
+    assert run(r"""
+    return string.match("x(a\0)z\0", "%b()z(%z)"), string.find("zz\0", "%z")
+    """) == ('\0', 3.0, 3.0)
@@ -0,0 +1,13 @@
+from orz.lua.runtime import load
+
+
+def run(source):
+    return load(source)()
+
+
+def test_chaining():
+    assert run("""
+    local strbuf = require("strbuf")
+    local b = strbuf.new("<")
+    return b:put("a"):put("b", 1):tostring(), b:putf("%d|%s", 2, "c"):tostring()
+    """) == ('<ab1', '<ab12|c')
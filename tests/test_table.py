@@ -0,0 +1,152 @@
+import sys
+
+from orz.lua.runtime import load
+from orz.lua.runtime.builtins import LuaTable, _items, _next
+
+from test_fold import names
+
+
+def run(source):
+    return load(source)()
+
+
+def test_assign_fields_during_pairs():
+    # the hash part holding integer keys only is rehashed by a new key,
+    # not by assigning to the existing ones
+    assert run("""
+    local t = {}
+    t[4], t[3], t[2] = 'd', 'c', 'b'
+    t.a, t.b = 1, 2
+
+    local n = 0
+    for k, v in pairs(t) do
+        t[2] = 'B'
+        t[k] = v
+        n = n + 1
+    end
+    return n, t[2]
+    """) == (5, 'B')
+
+
+def test_assign_fields_during_next():
+    assert run("""
+    local t = {}
+    for i = 10, 1, -1 do t[i * 2] = i end
+    t.x = 0
+
+    local n = 0
+    local k = next(t)
+    while k ~= nil do
+        t[k] = 1
+        t[4] = 2
+        n = n + 1
+        k = next(t, k)
+    end
+    return n, t[4]
+    """) == (11, 2)
+
+
+def test_new_integer_keys_move_to_array_part():
+    t, = run("""
+    local t = {}
+    for i = 100, 1, -1 do t[i] = i end
+    return t
+    """)
+
+    assert len(t.list) == 100
+    assert dict.__len__(t) == 0
+
+
+def test_next_visits_every_entry():
+    n, cleared = run("""
+    local t = {1, 2, 3, x = 4, y = 5, [10] = 6}
+    local n = 0
+    local k = next(t)
+    while k ~= nil do
+        n = n + 1
+        t[k] = nil
+        k = next(t, k)
+    end
+    return n, next(t) == nil
+    """)
+
+    assert (n, cleared) == (6, True)
+
+
+def test_next_from_any_key():
+    assert run("""
+    local t = {1, 2, x = 3}
+    local a = next(t)
+    local b = next(t, a)
+    local c = next(t, b)
+    return next(t, a) == b, next(t, b) == c, next(t, c) == nil
+    """) == (True, True, True)
+
+
+def test_next_cursor_holds_no_reference():
+    t, = run("return {1, 2, x = 3, y = 4}")
+    refs = sys.getrefcount(t)
+
+    _next(t)
+    _next(t, 2)
+
+    assert sys.getrefcount(t) == refs
+
+
+def test_keys_moved_to_array_part_during_pairs():
+    t = LuaTable({2: 'b', 3: 'c', 'x': 'd'})
+    seen = {}
+
+    for key, value in _items(t):
+        if not t.list:
+            t[1] = 'a'
+        seen[key] = value
+
+    assert t.list == ['a', 'b', 'c']
+    assert seen == {2: 'b', 3: 'c', 'x': 'd'}
+
+
+def test_booleans_are_not_numbers():
+    assert run("""
+    local t = {}
+    t[1] = 'n' t[true] = 'b' t[0] = 'z' t[false] = 'f'
+    local u = {}
+    u[true] = 'b' u[1] = 'n' u[false] = 'f' u[0] = 'z'
+    u[0.0] = 'Z' u[true] = 'B'
+    return t[1], t[true], t[0], t[false], u[1], u[true], u[0], u[false], #u
+    """) == ('n', 'b', 'z', 'f', 'n', 'B', 'Z', 'f', 1)
+
+
+def test_booleans_in_constructors():
+    t, = run("""
+    local yes, no, zero = true, false, 0
+    return {'n', [yes] = 'b', [no] = 'f', [zero] = 'z', [1 - 1] = 'Z', [true] = 'B'}
+    """)
+
+    assert (t[1], t[True], t[False], t[0]) == ('n', 'B', 'f', 'Z')
+    assert (t.rawget(1), t.rawget(True), t.rawget(0.0)) == ('n', 'B', 'Z')
+
+
+def test_booleans_in_traversals():
+    t, = run("return {'n', [true] = 'b', [false] = 'f', [0] = 'z', x = 'x'}")
+
+    items = dict((repr(k), v) for k, v in _items(t))
+    assert items == {'1': 'n', 'True': 'b', 'False': 'f', '0.0': 'z', "'x'": 'x'}
+
+    assert run("""
+    local t = {'n', [true] = 'b', [false] = 'f', [0] = 'z'}
+    local n = 0
+    local k, v = next(t)
+    while k ~= nil do
+        n = n + 1
+        t[k] = nil
+        k, v = next(t, k)
+    end
+    return n, next(t)
+    """) == (4, None)
+
+
+def test_constant_keys_used_as_they_are():
+    assert '.key' not in names('return {1, x = 2, [3] = 3, ["y"] = 4, [2 * 2] = 5}')
+    assert '.key' in names('return {[0] = 1}')
+    assert '.key' in names('local k = 1 return {[k] = 1}')